@@ -0,0 +1,181 @@
+# admission.py
+#
+# Admission control for the slow upstreams (LLM, OCR, YOLO detector).
+#   - every request gets a deadline (X-Request-Timeout-Ms header or REQUEST_BUDGET_S)
+#   - each upstream has a concurrency limit with a bounded wait queue; callers
+#     that cannot get a slot before their deadline are shed with Overloaded
+#   - routes ask should_skip() / remaining() to fall back to degraded modes
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+REQUEST_BUDGET_S = float(os.getenv("REQUEST_BUDGET_S", "20"))
+FRAME_BUDGET_S = float(os.getenv("FRAME_BUDGET_S", "2"))   # per live-scan frame (no HTTP middleware on websockets)
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# Minimum time left on the deadline to still attempt an optional stage
+NUTRITION_MIN_S = float(os.getenv("NUTRITION_MIN_S", "3"))
+DIET_MIN_S = float(os.getenv("DIET_MIN_S", "4"))
+ANNOTATE_MIN_S = float(os.getenv("ANNOTATE_MIN_S", "0.5"))
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class Overloaded(Exception):
+    """Raised when an upstream has no free slot before the request deadline."""
+
+    def __init__(self, upstream: str):
+        super().__init__(f"{upstream} overloaded")
+        self.upstream = upstream
+
+
+# =========================
+# DEADLINES
+# =========================
+
+def set_deadline(seconds: float):
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside a request."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def upstream_timeout(default: float) -> float:
+    """Timeout for an upstream call: the smaller of `default` and the time left."""
+    left = remaining()
+    return default if left is None else max(0.1, min(default, left))
+
+
+# =========================
+# LIMITERS
+# =========================
+
+class Limiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._cond = threading.Condition()
+
+    def busy(self) -> bool:
+        """True when a new caller would have to queue."""
+        return self.active >= self.max_concurrent
+
+    def _acquire(self, timeout: Optional[float]):
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue or (timeout is not None and timeout <= 0):
+                self.shed += 1
+                raise Overloaded(self.name)
+
+            self.waiting += 1
+            try:
+                ok = self._cond.wait_for(lambda: self.active < self.max_concurrent, timeout)
+            finally:
+                self.waiting -= 1
+            if not ok:
+                self.shed += 1
+                raise Overloaded(self.name)
+            self.active += 1
+
+    def _release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """Hold one upstream slot; waits at most until the request deadline."""
+        self._acquire(remaining())
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+        }
+
+
+LIMITERS = {
+    "llm": Limiter("llm", int(os.getenv("LLM_MAX_CONCURRENCY", "8")), int(os.getenv("LLM_MAX_QUEUE", "16"))),
+    "ocr": Limiter("ocr", int(os.getenv("OCR_MAX_CONCURRENCY", "2")), int(os.getenv("OCR_MAX_QUEUE", "4"))),
+    "detector": Limiter(
+        "detector", int(os.getenv("DETECTOR_MAX_CONCURRENCY", "2")), int(os.getenv("DETECTOR_MAX_QUEUE", "8"))
+    ),
+}
+
+
+def render_limiter_metrics() -> str:
+    """Prometheus gauges/counters for the limiters, appended to /metrics."""
+    lines = []
+    for metric, kind, attr in (
+        ("upstream_active", "gauge", "active"),
+        ("upstream_waiting", "gauge", "waiting"),
+        ("upstream_shed_total", "counter", "shed"),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, limiter in LIMITERS.items():
+            lines.append(f'{metric}{{upstream="{name}"}} {getattr(limiter, attr)}')
+    return "\n".join(lines) + "\n"
+
+
+def should_skip(upstream: str, min_seconds: float) -> bool:
+    """
+    Degrade instead of calling `upstream` when its queue is already building
+    or fewer than `min_seconds` are left on the request deadline.
+    """
+    limiter = LIMITERS[upstream]
+    left = remaining()
+    return limiter.waiting > 0 or (left is not None and left < min_seconds)
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Sets the request deadline from the header (capped at REQUEST_BUDGET_S)."""
+
+    async def dispatch(self, request, call_next):
+        budget = REQUEST_BUDGET_S
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                budget = min(budget, float(header) / 1000)
+            except ValueError:
+                pass
+
+        token = set_deadline(budget)
+        try:
+            return await call_next(request)
+        finally:
+            _deadline.reset(token)
+
+
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(
+        {"detail": str(exc), "upstream": exc.upstream},
+        status_code=503,
+        headers={"Retry-After": "2"},
+    )
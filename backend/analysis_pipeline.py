@@ -1,17 +1,51 @@
 #/Users/laraibnoorien/foodboss/culinary-mentor/models/laraib/analysis_pipeline.py
 # analysis_pipeline.py
 
+import copy
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
 from llm_client import call_llm
 from diet_prompt import nutrition_prompt, diet_prompt
+from prompt_budget import OUTPUT_TOKENS
+
+
+# Last good nutrition answers, served when the LLM is overloaded
+NUTRITION_CACHE_SIZE = 512
+_nutrition_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _nutrition_key(labels, portion, conditions):
+    return (tuple(sorted(labels)), str(portion), tuple(sorted(conditions)))
+
+
+def cached_nutrition(labels, portion, conditions):
+    key = _nutrition_key(labels, portion, conditions)
+    with _cache_lock:
+        data = _nutrition_cache.get(key)
+        if data is None:
+            return None
+        _nutrition_cache.move_to_end(key)
+        return copy.deepcopy(data)
 
 
 def analyze_nutrition(labels, portion, conditions):
-    data = call_llm(nutrition_prompt(labels, portion, conditions)) or {}
+    prompt = nutrition_prompt(labels, portion, conditions)
+    data = call_llm(prompt, OUTPUT_TOKENS["nutrition"], prompt_type="nutrition") or {}
+    if data:
+        with _cache_lock:
+            _nutrition_cache[_nutrition_key(labels, portion, conditions)] = copy.deepcopy(data)
+            if len(_nutrition_cache) > NUTRITION_CACHE_SIZE:
+                _nutrition_cache.popitem(last=False)
     return data
 
 
 def analyze_diet(labels, nutrition, conditions):
-    data = call_llm(diet_prompt(labels, nutrition, conditions)) or {}
+    prompt = diet_prompt(labels, nutrition, conditions)
+    data = call_llm(prompt, OUTPUT_TOKENS["diet"], prompt_type="diet") or {}
     return data
 
 
@@ -151,3 +185,67 @@ def compute_health_score(nutrition):
     score -= penalty
 
     return max(0, min(100, round(score)))
+
+
+# =========================
+# BATCH SCORING (meal history)
+# =========================
+# Same rules as above over NumPy columns, one row per meal. Missing values are
+# NaN and get the same defaults the dict-based helpers use.
+
+# (column, threshold, default when missing, label) — mirrors missing_nutrients()
+MISSING_RULES = [
+    ("iron_mg", 2, 6, "Iron"),
+    ("micro_fiber_g", 3, 7, "Fiber"),
+    ("vitamin_c_mg", 10, 30, "Vitamin C"),
+    ("calcium_mg", 100, 200, "Calcium"),
+]
+
+
+def _col(cols, name, default=0.0):
+    return np.where(np.isnan(cols[name]), default, cols[name])
+
+
+def missing_nutrients_batch(cols):
+    """Boolean matrix (meals x MISSING_RULES) of nutrients below threshold."""
+    return np.stack(
+        [_col(cols, name, default) < threshold for name, threshold, default, _ in MISSING_RULES],
+        axis=1,
+    )
+
+
+def compute_health_score_batch(cols):
+    """Vectorized compute_health_score(); `cols` maps column name -> 1-D array."""
+    protein = _col(cols, "protein_g")
+    carbs = _col(cols, "carbs_g")
+    fat = _col(cols, "fat_g")
+
+    # Macro balance (0–40)
+    p, c, f = protein * 4, carbs * 4, fat * 9
+    total = p + c + f
+    safe_total = np.where(total > 0, total, 1)
+    rp, rc, rf = p / safe_total * 100, c / safe_total * 100, f / safe_total * 100
+    macro = 40 - 10 * ((rp < 20) | (rp > 35)) - 10 * ((rc < 40) | (rc > 60)) - 10 * ((rf < 20) | (rf > 30))
+    macro = np.where(total > 0, np.maximum(macro, 0), 0)
+
+    # Micronutrient density (0–25)
+    n_micros = _col(cols, "n_micros")
+    missing = missing_nutrients_batch(cols).sum(axis=1)
+    micro = np.where(n_micros > 0, 25 * (n_micros - missing) / np.maximum(n_micros, 1), 0)
+    micro = np.clip(micro, 0, 25)
+
+    # Food quality (0–25)
+    quality = (
+        25
+        - 10 * (_col(cols, "calories") > 650)
+        - 7 * (_col(cols, "glycemic_index") > 70)
+        - 5 * (fat > 25)
+        - 3 * (_col(cols, "fiber_g") < 5)
+    )
+    quality = np.maximum(quality, 0)
+
+    # Medical suitability (0–10)
+    suitability = np.clip(10 + 2 * _col(cols, "suit_good") - 4 * _col(cols, "suit_bad"), 0, 10)
+
+    score = macro + micro + quality + suitability - _col(cols, "junk_penalty")
+    return np.clip(np.round(score), 0, 100).astype(int)
@@ -0,0 +1,94 @@
+# benchmarks/bench_hedging.py
+#
+# Tail latency of llm_router with and without hedging, against local fake
+# providers: a fast one with an occasional multi-second stall and a slower
+# but steady "local model" server.
+#
+#   python benchmarks/bench_hedging.py
+#   python benchmarks/bench_hedging.py --requests 400 --tail-rate 0.05 --tail-ms 3000
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+from run_bench import _point_config_at  # noqa: E402
+
+PROMPT = "Only JSON. Typical home shelf life of the grocery item \"milk\" after purchase."
+
+
+def _run(router, n, concurrency):
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            router.complete(PROMPT, 80, "shelf_life")
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - t0) * 1000, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(n)))
+    lat = np.array([ms for ms, _ in results])
+    return {
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "p99_ms": round(float(np.percentile(lat, 99)), 1),
+        "max_ms": round(float(lat.max()), 1),
+        "errors": sum(1 for _, ok in results if not ok),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--latency-ms", type=float, default=150)
+    ap.add_argument("--jitter-ms", type=float, default=30)
+    ap.add_argument("--tail-rate", type=float, default=0.05)
+    ap.add_argument("--tail-ms", type=float, default=3000)
+    ap.add_argument("--local-latency-ms", type=float, default=300)
+    ap.add_argument("--hedge-budget", type=float, default=0.1)
+    args = ap.parse_args()
+
+    remote = FakeLLMServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           tail_rate=args.tail_rate, tail_ms=args.tail_ms).start()
+    local = FakeLLMServer(latency_ms=args.local_latency_ms, jitter_ms=args.jitter_ms).start()
+    _point_config_at(remote.url)
+
+    import llm_router
+    from llm_router import LLMRouter, Provider
+
+    def providers(with_local):
+        out = [Provider("remote", remote.url, "bench", "fake-large")]
+        if with_local:
+            out.append(Provider("local", local.url, "bench", "fake-small"))
+        return out
+
+    scenarios = {
+        "single, no hedge": LLMRouter(providers(False), hedge_budget=0),
+        "single, hedged": LLMRouter(providers(False), hedge_budget=args.hedge_budget),
+        "remote+local, hedged": LLMRouter(providers(True), hedge_budget=args.hedge_budget),
+    }
+    try:
+        for name, router in scenarios.items():
+            _run(router, llm_router.MIN_SAMPLES + 5, args.concurrency)  # hedging waits for a trusted p95
+            row = _run(router, args.requests, args.concurrency)
+            hedges = sum(p.hedges for p in router.providers)
+            wins = sum(p.wins_as_hedge for p in router.providers)
+            print(f"{name:22s} p50={row['p50_ms']:>7} p95={row['p95_ms']:>7} p99={row['p99_ms']:>7} "
+                  f"max={row['max_ms']:>7} errors={row['errors']} hedges={hedges} hedge_wins={wins}")
+    finally:
+        remote.stop()
+        local.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_ocr_encoding.py
+#
+# Compares upload encodings for the bill OCR call.
+#
+#   python benchmarks/bench_ocr_encoding.py path/to/bills/
+#   python benchmarks/bench_ocr_encoding.py path/to/bills/ --ocr   # also calls Mistral
+#
+# With --ocr the folder must contain a labels.json mapping file name to the
+# expected item list, e.g. {"bill1.jpg": ["milk", "bread"]}.
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_bench import load_ocr_module  # noqa: E402
+
+ocr_mistral = load_ocr_module()
+preprocess_for_ocr, encode_for_ocr = ocr_mistral.preprocess_for_ocr, ocr_mistral.encode_for_ocr
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+# name -> (preprocess?, format, quality)
+VARIANTS = {
+    "png_full": (False, "PNG", None),
+    "jpeg_q70": (True, "JPEG", 70),
+    "jpeg_q50": (True, "JPEG", 50),
+    "webp_q60": (True, "WEBP", 60),
+}
+
+
+def _encode(path, preprocess, fmt, quality):
+    image = Image.open(path)
+    t0 = time.perf_counter()
+    if preprocess:
+        image = preprocess_for_ocr(image)
+        mime, b64 = encode_for_ocr(image, fmt, quality)
+    else:
+        # the old path: full-resolution PNG of the original image
+        mime, b64 = encode_for_ocr(image.convert("RGB"), "PNG")
+    return mime, b64, (time.perf_counter() - t0) * 1000
+
+
+def _f1(found, expected):
+    found, expected = set(found), set(expected)
+    if not found and not expected:
+        return 1.0
+    tp = len(found & expected)
+    if tp == 0:
+        return 0.0
+    p, r = tp / len(found), tp / len(expected)
+    return 2 * p * r / (p + r)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--ocr", action="store_true", help="call the OCR model and score extraction")
+    ap.add_argument("--out", default="bench_ocr_encoding.json")
+    args = ap.parse_args()
+
+    files = sorted(f for f in os.listdir(args.folder) if f.lower().endswith(IMAGE_EXTS))
+    if not files:
+        sys.exit(f"no images in {args.folder}")
+
+    labels = {}
+    if args.ocr:
+        with open(os.path.join(args.folder, "labels.json"), encoding="utf-8") as f:
+            labels = json.load(f)
+
+    report = {}
+    for name, (preprocess, fmt, quality) in VARIANTS.items():
+        sizes, times, scores = [], [], []
+        for fname in files:
+            mime, b64, ms = _encode(os.path.join(args.folder, fname), preprocess, fmt, quality)
+            sizes.append(len(b64))
+            times.append(ms)
+            if args.ocr and fname in labels:
+                scores.append(_f1(ocr_mistral.ocr_items(mime, b64), labels[fname]))
+
+        report[name] = {
+            "images": len(files),
+            "payload_kb_mean": round(statistics.mean(sizes) / 1024, 1),
+            "encode_ms_mean": round(statistics.mean(times), 1),
+            "encode_ms_max": round(max(times), 1),
+            "item_f1_mean": round(statistics.mean(scores), 3) if scores else None,
+        }
+        print(f"{name:10s} {report[name]}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/bench_serialization.py
+#
+# Serialization time and bytes on the wire for representative response
+# payloads: FastAPI's default path (jsonable_encoder + json.dumps) versus
+# FastJSONResponse (orjson), and raw vs gzip / brotli body size.
+#
+#   python benchmarks/bench_serialization.py
+#   python benchmarks/bench_serialization.py --image ~/food_samples/plate.jpg --meals 2000
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_bench import _point_config_at, synthetic_images  # noqa: E402
+from fake_llm_server import CANNED  # noqa: E402
+
+_point_config_at("http://127.0.0.1:9")   # nothing is called; config only has to import
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from serialization import FastJSONResponse, compress, brotli, orjson  # noqa: E402
+from vision import annotate, encode_base64  # noqa: E402
+from recipe_index import recipe_index  # noqa: E402
+from meal_history import MealHistory  # noqa: E402
+
+
+def _best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def default_render(payload) -> bytes:
+    # What JSONResponse does for a plain dict returned from a route
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def payloads(image_bytes, n_meals):
+    image = Image.open(io.BytesIO(image_bytes))
+    w, h = image.size
+    boxes = {"rice": [0, 0, w // 2, h // 2], "dal": [w // 2, h // 2, w - 1, h - 1]}
+    confs = {"rice": 0.91, "dal": 0.84}
+    nutrition = CANNED["nutrition"]
+    analyze = {
+        "detected_food": ["rice", "dal"],
+        "estimated_calories": nutrition["estimated_calories"],
+        "macros": nutrition["macros"],
+        "micronutrients": nutrition.get("micronutrients", {}),
+        "glycemic_index": nutrition.get("glycemic_index", 0),
+        "diet_suitability": nutrition.get("diet_suitability", {}),
+        "overall_comment": nutrition.get("overall_comment", ""),
+        "diet_recommendations": CANNED["diet"],
+        "health_score": 72,
+        "missing_nutrients": ["vitamin_b12_mcg"],
+        "image_with_boxes": encode_base64(annotate(image, boxes, confs)),
+        "detector_path": {"path": "indian_only", "reason": "confident"},
+        "partial": False,
+        "degraded": [],
+    }
+
+    suggest = {"suggestions": recipe_index.rank(
+        [{"name": n, "daysLeft": d} for n, d in
+         [("spinach", 1), ("paneer", 3), ("onion", 10), ("tomato", 4), ("rice", 30), ("egg", 5)]],
+        top_k=20,
+    )}
+
+    history = MealHistory(tempfile.mkdtemp(prefix="bench_meals_"))
+    day = 86400
+    start = time.time() - n_meals * day / 3
+    for i in range(n_meals):
+        history.log_meal("bench", ["rice", "dal"], nutrition, score=70, ts=start + i * day / 3)
+
+    return {
+        "/analyze": analyze,
+        "/api/recipe/generate": CANNED["recipe"],
+        "/api/recipe/suggest": suggest,
+        "/api/meals/{user}/history": history.history("bench"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--image", help="JPEG to annotate for the /analyze payload (default: synthetic 1280px)")
+    ap.add_argument("--meals", type=int, default=1000, help="meals in the history payload")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--out", default="bench_serialization.json")
+    args = ap.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = [data for name, data in synthetic_images() if "1280" in name][0]
+
+    print(f"orjson: {'yes' if orjson else 'no'}, brotli: {'yes' if brotli else 'no'}")
+    rows = []
+    for route, payload in payloads(image_bytes, args.meals).items():
+        default_body = default_render(payload)
+        fast_body = FastJSONResponse(payload).body
+        row = {
+            "route": route,
+            "default_ms": round(_best_ms(lambda: default_render(payload), args.repeat), 3),
+            "fast_ms": round(_best_ms(lambda: FastJSONResponse(payload), args.repeat), 3),
+            "raw_bytes": len(fast_body),
+            "default_bytes": len(default_body),
+        }
+        for coding in ("gzip", "br"):
+            if coding == "br" and brotli is None:
+                continue
+            row[f"{coding}_bytes"] = len(compress(fast_body, coding))
+            row[f"{coding}_ms"] = round(_best_ms(lambda: compress(fast_body, coding), max(3, args.repeat // 4)), 3)
+        rows.append(row)
+
+        extra = "".join(
+            f" {c}={row[c + '_bytes']:>9}B/{row[c + '_ms']:.2f}ms" for c in ("gzip", "br") if c + "_bytes" in row
+        )
+        print(f"{route:28s} default={row['default_ms']:>8.3f}ms fast={row['fast_ms']:>8.3f}ms "
+              f"raw={row['raw_bytes']:>9}B{extra}")
+
+    with open(args.out, "w") as f:
+        json.dump(rows, f, indent=2)
+    print("saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/eval_cascade.py
+#
+# Accuracy / latency trade-off of the "auto" detector cascade.
+#
+#   python benchmarks/eval_cascade.py path/to/plates/
+#   python benchmarks/eval_cascade.py path/to/plates/ --fit-router     # also writes data/cuisine_router.npz
+#
+# The folder may hold indian/ and western/ sub-folders (used as cuisine labels
+# for the router); other images are used without a label. Each image goes
+# through both YOLO models once; the cascade is then replayed offline for a
+# grid of thresholds, with the "both models" label set as the reference.
+# Needs the real model weights from config.
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import multi_model_detection as mmd  # noqa: E402
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+CUISINES = ("indian", "western")
+
+
+def load_folder(root):
+    items = []
+    for dirpath, _, files in os.walk(root):
+        cuisine = os.path.basename(dirpath).lower()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS):
+                items.append((os.path.join(dirpath, name), cuisine if cuisine in CUISINES else None))
+    return items
+
+
+def _timed(model, image):
+    t0 = time.perf_counter()
+    det = mmd._run_model(model, image)
+    return det, (time.perf_counter() - t0) * 1000
+
+
+def _f1(pred, ref):
+    if not ref:
+        return 1.0 if not pred else 0.0
+    tp = len(pred & ref)
+    if tp == 0:
+        return 0.0
+    p, r = tp / len(pred), tp / len(ref)
+    return 2 * p * r / (p + r)
+
+
+def fit_router(samples, path):
+    feats = {c: [s["features"] for s in samples if s["cuisine"] == c] for c in CUISINES}
+    if not all(feats.values()):
+        print("need images in both indian/ and western/ to fit the router")
+        return None
+    centroids = np.stack([np.mean(feats[c], axis=0) for c in CUISINES])
+    np.savez(path, centroids=centroids, labels=np.array(CUISINES))
+    print(f"router saved to {path} ({', '.join(f'{c}: {len(feats[c])}' for c in CUISINES)} images)")
+    return mmd.CuisineRouter(centroids, list(CUISINES))
+
+
+def replay(samples, first_of, max_conf, mean_conf):
+    """Simulated cascade over cached detections: mean latency, mean F1, escalation rate."""
+    lat, f1s, escalated = [], [], 0
+    for s in samples:
+        first = first_of(s)
+        second = "western" if first == "indian" else "indian"
+        det, ms = s["det"][first], s["ms"][first] + s["route_ms"]
+        esc, _ = mmd.needs_second(det, max_conf, mean_conf)
+        if esc:
+            det = det + s["det"][second]
+            ms += s["ms"][second]
+            escalated += 1
+        lat.append(ms)
+        f1s.append(_f1({lbl for lbl, _, _ in det}, s["reference"]))
+    return {
+        "mean_ms": round(float(np.mean(lat)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "label_f1": round(float(np.mean(f1s)), 3),
+        "escalation_rate": round(escalated / len(samples), 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folder")
+    ap.add_argument("--fit-router", action="store_true", help="fit and save the nearest-centroid router")
+    ap.add_argument("--router-out", default=mmd.ROUTER_PATH)
+    ap.add_argument("--max-conf", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8])
+    ap.add_argument("--mean-conf", type=float, nargs="+", default=[0.0, 0.5, 0.6])
+    ap.add_argument("--out", default="eval_cascade.json")
+    args = ap.parse_args()
+
+    items = load_folder(args.folder)
+    if not items:
+        sys.exit(f"no images in {args.folder}")
+
+    samples = []
+    for path, cuisine in items:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        t0 = time.perf_counter()
+        feats = mmd.route_features(image)
+        route_ms = (time.perf_counter() - t0) * 1000
+        det_i, ms_i = _timed(mmd.indian_model, image)
+        det_w, ms_w = _timed(mmd.western_model, image)
+        samples.append({
+            "path": path, "cuisine": cuisine, "features": feats, "route_ms": route_ms,
+            "det": {"indian": det_i, "western": det_w}, "ms": {"indian": ms_i, "western": ms_w},
+            "reference": {lbl for lbl, _, _ in det_i + det_w},
+        })
+    print(f"{len(samples)} images, both models: mean "
+          f"{np.mean([s['ms']['indian'] + s['ms']['western'] for s in samples]):.1f} ms")
+
+    router = fit_router(samples, args.router_out) if args.fit_router else mmd.cuisine_router
+
+    policies = {"default_first": lambda s: mmd.CASCADE_FIRST}
+    if router is not None:
+        # same decision as production: CuisineRouter.predict_features + pick_first
+        policies["router"] = lambda s: mmd.pick_first(*router.predict_features(s["features"]))[0]
+
+        labelled = [s for s in samples if s["cuisine"]]
+        if labelled:
+            acc = np.mean([router.predict_features(s["features"])[0] == s["cuisine"] for s in labelled])
+            print(f"router accuracy on {len(labelled)} labelled images: {acc:.3f}"
+                  + (" (fit on the same images)" if args.fit_router else ""))
+    if any(s["cuisine"] for s in samples):
+        policies["oracle"] = lambda s: s["cuisine"] or mmd.CASCADE_FIRST
+
+    rows = []
+    both = replay(samples, policies["default_first"], float("inf"), 0.0)
+    rows.append({"policy": "both_models", "max_conf": None, "mean_conf": None, **both})
+    for (name, fn), max_conf, mean_conf in itertools.product(policies.items(), args.max_conf, args.mean_conf):
+        rows.append({"policy": name, "max_conf": max_conf, "mean_conf": mean_conf,
+                     **replay(samples, fn, max_conf, mean_conf)})
+
+    for r in rows:
+        print(f"{r['policy']:14s} max={str(r['max_conf']):5s} mean={str(r['mean_conf']):5s} "
+              f"mean_ms={r['mean_ms']:>8} p95_ms={r['p95_ms']:>8} f1={r['label_f1']:.3f} "
+              f"escalated={r['escalation_rate']:.2f}")
+
+    with open(args.out, "w") as f:
+        json.dump({"images": len(samples), "results": rows}, f, indent=2)
+    print("saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/fake_llm_server.py
+#
+# Local stand-in for the Groq / OpenAI-compatible /chat/completions API.
+# Picks a canned JSON answer from the prompt text and sleeps for a
+# configurable latency, so the backend can be benchmarked offline.
+#
+#   python benchmarks/fake_llm_server.py --port 9100 --latency-ms 400 --jitter-ms 100
+#   python benchmarks/fake_llm_server.py --latency-ms 300 --tail-rate 0.05 --tail-ms 4000
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (marker in prompt, prompt type) — first match wins
+PROMPT_TYPES = [
+    ("improve diet balance", "diet"),
+    ("estimate real nutrition", "nutrition"),
+    ("replace one ingredient", "replacement"),
+    ("modify an existing recipe", "adjust"),
+    ("create a recipe", "recipe"),
+    ("shelf life", "shelf_life"),
+]
+
+CANNED = {
+    "nutrition": {
+        "estimated_calories": 520,
+        "macros": {"protein_g": 24, "carbs_g": 62, "fat_g": 18, "fiber_g": 7},
+        "micronutrients": {
+            "iron_mg": 3.1, "calcium_mg": 180, "magnesium_mg": 90,
+            "potassium_mg": 640, "vitamin_c_mg": 22, "vitamin_b12_mcg": 0.6,
+        },
+        "glycemic_index": 55,
+        "diet_suitability": {
+            "diabetic": "moderate", "high_bp": "safe",
+            "high_cholesterol": "moderate", "weight_loss": "moderate",
+        },
+        "overall_comment": "Balanced meal with moderate calories.",
+    },
+    "diet": {
+        "add": ["salad", "curd"],
+        "reduce": ["oil"],
+        "pairings": ["dal with brown rice"],
+        "overall_comment": "Add greens for fibre.",
+    },
+    "recipe": {
+        "title": "Benchmark Curry",
+        "servings": 2,
+        "ingredients": [
+            {"name": "chickpeas", "qty": "200 g"},
+            {"name": "onion", "qty": "1 cup"},
+            {"name": "tomato", "qty": "2"},
+            {"name": "oil", "qty": "1 tbsp"},
+        ],
+        "steps": ["Heat oil.", "Fry onion.", "Add tomato and chickpeas.", "Simmer 15 minutes."],
+    },
+    "adjust": {
+        "title": "Benchmark Curry",
+        "servings": 2,
+        "ingredients": [{"name": "chickpeas", "qty": "200 g"}, {"name": "onion", "qty": "1 cup"}],
+        "steps": ["Fry onion.", "Add chickpeas.", "Simmer 15 minutes."],
+    },
+    "replacement": {
+        "ingredient": "paneer",
+        "replacements": [{"name": "tofu", "reason": "Similar texture, plant based."}],
+    },
+    "shelf_life": {"category": "Unknown", "storage": "fridge", "days": {"fridge": 5}},
+}
+
+
+def prompt_type(prompt: str) -> str:
+    low = prompt.lower()
+    for marker, kind in PROMPT_TYPES:
+        if marker in low:
+            return kind
+    return "unknown"
+
+
+class FakeLLMServer:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=300.0, jitter_ms=0.0,
+                 canned=None, error_rate=0.0, tail_rate=0.0, tail_ms=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate    # fraction of requests that take tail_ms instead
+        self.tail_ms = tail_ms
+        self.canned = dict(CANNED, **(canned or {}))
+        self.calls = {}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+                kind = prompt_type(prompt)
+                with server._lock:
+                    server.calls[kind] = server.calls.get(kind, 0) + 1
+
+                delay = max(0.0, random.gauss(server.latency_ms, server.jitter_ms)) if server.jitter_ms \
+                    else server.latency_ms
+                if random.random() < server.tail_rate:
+                    delay = server.tail_ms
+                time.sleep(delay / 1000)
+
+                if random.random() < server.error_rate:
+                    self.send_error(503, "fake upstream error")
+                    return
+
+                content = json.dumps(server.canned.get(kind, {}))
+                payload = json.dumps({
+                    "id": "fake",
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass   # client hung up (e.g. a cancelled hedge)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0)
+    ap.add_argument("--tail-rate", type=float, default=0)
+    ap.add_argument("--tail-ms", type=float, default=0)
+    args = ap.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency_ms, args.jitter_ms, error_rate=args.error_rate,
+                           tail_rate=args.tail_rate, tail_ms=args.tail_ms)
+    print("fake LLM listening on", server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
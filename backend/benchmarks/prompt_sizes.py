@@ -0,0 +1,89 @@
+# benchmarks/prompt_sizes.py
+#
+# Prompt size regression check: builds every prompt from representative
+# inputs, prints the estimated token counts and exits non-zero if one goes
+# over its budget in prompt_budget.PROMPT_TOKEN_BUDGET.
+#
+#   python benchmarks/prompt_sizes.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_budget import estimate_tokens, PROMPT_TOKEN_BUDGET, OUTPUT_TOKENS  # noqa: E402
+from diet_prompt import nutrition_prompt, diet_prompt  # noqa: E402
+from recipe_prompt import (  # noqa: E402
+    build_recipe_prompt,
+    build_adjust_recipe_prompt,
+    build_replacement_prompt,
+)
+
+LABELS = ["butter chicken", "naan", "jeera rice", "cucumber raita"]
+CONDITIONS = ["diabetic", "high_bp"]
+
+NUTRITION = {
+    "estimated_calories": 912.4567,
+    "macros": {"protein_g": 41.23456, "carbs_g": 98.7654, "fat_g": 38.1111, "fiber_g": 6.4321},
+    "micronutrients": {
+        "iron_mg": 4.56789, "calcium_mg": 310.0, "magnesium_mg": 120.5, "potassium_mg": 880.25,
+        "vitamin_c_mg": 12.75, "vitamin_b12_mcg": 1.2345,
+    },
+    "glycemic_index": 62,
+    "diet_suitability": {"diabetic": "moderate", "high_bp": "avoid", "high_cholesterol": "avoid",
+                         "weight_loss": "avoid"},
+    "overall_comment": "A rich, calorie-dense meal high in saturated fat from butter and cream; "
+                       "pair with salad and keep portions small if managing blood pressure.",
+    "detected_food": LABELS,
+}
+
+RECIPE = {
+    "title": "Butter Chicken",
+    "servings": 4,
+    "ingredients": [
+        {"name": "chicken thigh", "qty": "600 g", "calories": 1100.0},
+        {"name": "butter", "qty": "3 tbsp", "calories": 300.0},
+        {"name": "cream", "qty": "1/2 cup", "calories": 400.0},
+        {"name": "tomato puree", "qty": "1 1/2 cups", "calories": 90.0},
+        {"name": "garlic", "qty": "4 cloves", "calories": 20.0},
+        {"name": "ginger", "qty": "1 tbsp", "calories": 5.0},
+        {"name": "garam masala", "qty": "2 tsp", "calories": 10.0},
+        {"name": "kasuri methi", "qty": "1 tsp", "calories": 2.0},
+        {"name": "salt", "qty": "to taste", "calories": 0.0},
+    ],
+    "steps": [
+        "Marinate the chicken with yogurt, salt and half the spices for 30 minutes.",
+        "Sear the chicken in a hot pan until browned, then set aside.",
+        "Melt butter, add garlic and ginger and cook for a minute.",
+        "Add tomato puree and the remaining spices and simmer for 10 minutes.",
+        "Stir in cream and kasuri methi, return the chicken and simmer for 10 minutes.",
+    ],
+    "nutrition": {"calories": 1927.0, "protein_g": 130.0},
+}
+
+
+def prompts():
+    return {
+        "nutrition": nutrition_prompt(LABELS, 1.5, CONDITIONS),
+        "diet": diet_prompt(LABELS, NUTRITION, CONDITIONS),
+        "recipe": build_recipe_prompt("butter chicken", 4, ["halal", "high protein"]),
+        "adjust": build_adjust_recipe_prompt(RECIPE, ["cream"], [{"name": "cashew paste", "qty": "1/4 cup"}],
+                                             ["halal"]),
+        "replacement": build_replacement_prompt("cream", RECIPE, ["halal"], ["yogurt"]),
+    }
+
+
+def main():
+    failed = False
+    print(f"{'prompt':12s} {'chars':>6s} {'tokens':>7s} {'budget':>7s} {'max_out':>8s}")
+    for name, text in prompts().items():
+        tokens = estimate_tokens(text)
+        budget = PROMPT_TOKEN_BUDGET[name]
+        flag = "" if tokens <= budget else "  OVER BUDGET"
+        failed |= tokens > budget
+        print(f"{name:12s} {len(text):6d} {tokens:7d} {budget:7d} {OUTPUT_TOKENS[name]:8d}{flag}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
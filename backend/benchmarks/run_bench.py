@@ -0,0 +1,334 @@
+# benchmarks/run_bench.py
+#
+# Offline end-to-end benchmark of the FastAPI app.
+#
+# Starts a fake Groq-compatible server (fake_llm_server.py), points the LLM
+# client at it, serves `main:app` with uvicorn on a free port and drives each
+# route at several concurrency levels. Reports p50/p95/p99 latency and req/s.
+#
+#   python benchmarks/run_bench.py
+#   python benchmarks/run_bench.py --llm-latency-ms 800 --concurrency 1 8 32 --requests 200
+#   python benchmarks/run_bench.py --detector real --images ~/food_samples
+#
+# With --detector stub (default) the YOLO models are replaced by a fixed-cost
+# stand-in so the run does not need model weights.
+
+import io
+import os
+import sys
+import json
+import time
+import types
+import socket
+import random
+import argparse
+import tempfile
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMServer  # noqa: E402
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+SAMPLE_RECIPE = {
+    "title": "Chana Masala",
+    "servings": 2,
+    "ingredients": [
+        {"name": "chickpeas", "qty": "200 g"},
+        {"name": "onion", "qty": "1 cup"},
+        {"name": "tomato", "qty": "2"},
+        {"name": "paneer", "qty": "100 g"},
+        {"name": "oil", "qty": "1 tbsp"},
+    ],
+    "steps": ["Heat oil.", "Fry onion.", "Add tomato, chickpeas and paneer.", "Simmer 15 minutes."],
+    "nutrition": {},
+}
+
+
+# ---------- environment setup ----------
+
+def _point_config_at(llm_url: str):
+    """Make `config` resolve to the fake server before llm_client is imported."""
+    try:
+        import config
+    except ImportError:
+        config = types.ModuleType("config")
+        config.GROQ_API_KEY = "offline-bench"
+        config.LLM_MODEL = "fake-model"
+        config.LLM_MAX_TOKENS = 800
+        config.MISTRAL_API_KEY = "offline-bench"
+        config.WESTERN_MODEL_PATH = config.INDIAN_MODEL_PATH = ""
+        sys.modules["config"] = config
+    config.GROQ_API_BASE = llm_url
+
+
+def _install_stub_detector(latency_ms: float):
+    """Fixed-cost stand-in for multi_model_detection (no YOLO weights needed)."""
+    stub = types.ModuleType("multi_model_detection")
+
+    def detect_with_route(image, model_type="auto"):
+        # "auto" costs one model: the stub's detections are confident, so the cascade stops early
+        time.sleep(latency_ms / 1000)
+        h, w = image.shape[:2]
+        path = f"{model_type}_only" if model_type in ("indian", "western") else "indian_only"
+        return (
+            ["rice", "dal"],
+            {"rice": 0.91, "dal": 0.84},
+            {"rice": [0, 0, w // 2, h // 2], "dal": [w // 2, h // 2, w - 1, h - 1]},
+            {"path": path, "reason": "stub"},
+        )
+
+    def detect_best_conf(image, model_type="auto"):
+        return detect_with_route(image, model_type)[:3]
+
+    stub.detect_with_route = detect_with_route
+    stub.detect_best_conf = detect_best_conf
+    sys.modules["multi_model_detection"] = stub
+
+
+class _FakeOCRClient:
+    """Mimics mistralai `client.chat.complete(...)` with a fixed delay."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.chat = self
+
+    def complete(self, **_):
+        time.sleep(self.latency_ms / 1000)
+        msg = types.SimpleNamespace(content="milk, bread, eggs, tomato, spinach")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)])
+
+
+def load_ocr_module():
+    """The OCR module the inventory routes use, so stubbing its client affects the app."""
+    import importlib
+
+    return importlib.import_module("rima.ocr_mistral")
+
+
+def _stub_ocr(latency_ms: float):
+    try:
+        ocr_mistral = load_ocr_module()
+    except Exception as e:  # OCR module needs mistralai; skip when unavailable
+        print("OCR stub not installed:", e)
+        return
+    ocr_mistral.client = _FakeOCRClient(latency_ms)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_app(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# ---------- inputs ----------
+
+def synthetic_images(sizes=(640, 1280), n=4, seed=0):
+    """Plate-like JPEGs: noisy background with a few coloured blobs."""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    images = []
+    for size in sizes:
+        for _ in range(n):
+            img = Image.fromarray(np_rng.integers(0, 255, (size * 3 // 4, size, 3), dtype=np.uint8))
+            draw = ImageDraw.Draw(img)
+            for _ in range(5):
+                x, y, r = rng.randrange(size), rng.randrange(size * 3 // 4), rng.randrange(20, size // 5)
+                draw.ellipse([x - r, y - r, x + r, y + r], fill=tuple(rng.randrange(256) for _ in range(3)))
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=85)
+            images.append((f"synthetic_{size}.jpg", buf.getvalue()))
+    return images
+
+
+def folder_images(folder):
+    out = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTS):
+            with open(os.path.join(folder, name), "rb") as f:
+                out.append((name, f.read()))
+    return out
+
+
+# ---------- routes ----------
+
+def route_specs(images):
+    """name -> (path, function(session, base_url, i) -> response)."""
+    def analyze(s, base, i):
+        name, data = images[i % len(images)]
+        return s.post(f"{base}/analyze", files={"file": (name, data, "image/jpeg")},
+                      data={"portion": "1.0", "conditions": "diabetic", "model_type": "auto"})
+
+    def analyze_text(s, base, i):
+        return s.post(f"{base}/analyze", data={"description": "rice, dal, salad"})
+
+    def generate(s, base, i):
+        return s.post(f"{base}/api/recipe/generate",
+                      json={"dish": f"chana masala {i % 5}", "servings": 2, "preferences": ["vegetarian"]})
+
+    def update(s, base, i):
+        return s.post(f"{base}/api/recipe/update",
+                      json={"recipe": SAMPLE_RECIPE, "excluded_items": ["paneer"], "added_items": [],
+                            "preferences": [], "servings": 4})
+
+    def replace(s, base, i):
+        return s.post(f"{base}/api/recipe/replace",
+                      json={"recipe": SAMPLE_RECIPE, "ingredient_name": "paneer", "preferences": ["vegan"]})
+
+    def suggest(s, base, i):
+        return s.post(f"{base}/api/recipe/suggest",
+                      json={"items": [{"name": "spinach", "daysLeft": 1}, {"name": "paneer", "daysLeft": 3},
+                                      {"name": "onion", "daysLeft": 10}, {"name": "tomato", "daysLeft": 4}]})
+
+    def scan_bill(s, base, i):
+        name, data = images[i % len(images)]
+        return s.post(f"{base}/inventory/scan-bill", files={"file": (name, data, "image/jpeg")})
+
+    return {
+        "analyze_image": ("/analyze", analyze),
+        "analyze_text": ("/analyze", analyze_text),
+        "recipe_generate": ("/api/recipe/generate", generate),
+        "recipe_update": ("/api/recipe/update", update),
+        "recipe_replace": ("/api/recipe/replace", replace),
+        "recipe_suggest": ("/api/recipe/suggest", suggest),
+        "inventory_scan_bill": ("/inventory/scan-bill", scan_bill),
+    }
+
+
+# ---------- load generation ----------
+
+def _percentiles(lat_ms):
+    if not lat_ms:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+def run_load(base_url, fn, n_requests, concurrency):
+    local = threading.local()
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            ok = fn(local.session, base_url, i).status_code < 400
+        except requests.RequestException:
+            ok = False
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            latencies.append(ms)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - t0
+
+    return dict(
+        requests=n_requests,
+        concurrency=concurrency,
+        errors=errors,
+        rps=round(n_requests / wall, 2),
+        mean_ms=round(float(np.mean(latencies)), 2),
+        **_percentiles(latencies),
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--routes", nargs="*", help="subset of route names (default: all mounted)")
+    ap.add_argument("--concurrency", nargs="*", type=int, default=[1, 4, 16])
+    ap.add_argument("--requests", type=int, default=50, help="requests per route and concurrency level")
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--llm-jitter-ms", type=float, default=50)
+    ap.add_argument("--ocr-latency-ms", type=float, default=600)
+    ap.add_argument("--detector", choices=["stub", "real"], default="stub")
+    ap.add_argument("--detector-latency-ms", type=float, default=60)
+    ap.add_argument("--images", help="folder of sample food images (synthetic images are always included)")
+    ap.add_argument("--out", default="bench_results.json")
+    args = ap.parse_args()
+    out_path = os.path.abspath(args.out)
+
+    # Keep benchmark meals / recipes / background jobs out of the real data directory
+    scratch = tempfile.mkdtemp(prefix="bench_")
+    os.environ.setdefault("MEAL_HISTORY_DIR", os.path.join(scratch, "meals"))
+    os.environ.setdefault("RECIPE_DB_PATH", os.path.join(scratch, "recipes.db"))
+    os.environ.setdefault("JOBS_PATH", os.path.join(scratch, "jobs_pending.json"))
+
+    llm = FakeLLMServer(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms).start()
+    _point_config_at(llm.url)
+    if args.detector == "stub":
+        _install_stub_detector(args.detector_latency_ms)
+    _stub_ocr(args.ocr_latency_ms)
+
+    os.chdir(BACKEND_DIR)
+    from main import app
+
+    images = synthetic_images() + (folder_images(args.images) if args.images else [])
+    port = _free_port()
+    server = _start_app(app, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    mounted = {getattr(r, "path", None) for r in app.routes}
+    specs = route_specs(images)
+    names = args.routes or [n for n, (path, _) in specs.items() if path in mounted]
+
+    results = []
+    try:
+        for name in names:
+            path, fn = specs[name]
+            fn(requests, base_url, 0)  # warm-up
+            for c in args.concurrency:
+                row = {"route": name, "path": path, **run_load(base_url, fn, args.requests, c)}
+                results.append(row)
+                print(f"{name:20s} c={c:<3d} p50={row['p50_ms']:>8} p95={row['p95_ms']:>8} "
+                      f"p99={row['p99_ms']:>8} rps={row['rps']:>7} errors={row['errors']}")
+    finally:
+        server.should_exit = True
+        llm.stop()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "detector": args.detector,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "ocr_latency_ms": args.ocr_latency_ms,
+            "images": len(images),
+            "llm_calls": llm.calls,
+        },
+        "results": results,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("saved", out_path)
+
+
+if __name__ == "__main__":
+    main()
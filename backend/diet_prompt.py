@@ -1,54 +1,24 @@
 # diet_prompt.py
 
-def nutrition_prompt(labels, portion, conditions):
-    return f"""
-Only JSON. Estimate real nutrition. Ensure values scale with portion.
+from prompt_budget import compact_json, round_numbers
 
-Foods: {labels}
-Portion Multiplier: {portion}
-Conditions: {conditions}
+# Only these nutrition fields matter for diet advice; the prose fields
+# (overall_comment, suitability labels) are not sent back to the model.
+DIET_NUTRITION_FIELDS = ("estimated_calories", "macros", "micronutrients", "glycemic_index")
 
-Schema:
-{{
-  "estimated_calories": number,
-  "macros": {{
-    "protein_g": number,
-    "carbs_g": number,
-    "fat_g": number,
-    "fiber_g": number
-  }},
-  "micronutrients": {{
-    "iron_mg": number,
-    "calcium_mg": number,
-    "magnesium_mg": number,
-    "potassium_mg": number,
-    "vitamin_c_mg": number,
-    "vitamin_b12_mcg": number
-  }},
-  "glycemic_index": number,
-  "diet_suitability": {{
-    "diabetic": "safe"|"moderate"|"avoid",
-    "high_bp": "safe"|"moderate"|"avoid",
-    "high_cholesterol": "safe"|"moderate"|"avoid",
-    "weight_loss": "safe"|"moderate"|"avoid"
-  }},
-  "overall_comment": "string"
-}}
-"""
 
-def diet_prompt(labels, nutrition, conditions):
-    return f"""
-Only JSON response. Improve diet balance.
+def nutrition_prompt(labels, portion, conditions):
+    data = {"foods": labels, "portion": portion, "conditions": conditions}
+    return f"""Only JSON. Estimate real nutrition. Ensure values scale with portion.
+Input: {compact_json(data)}
+Schema (0 = number, S = "safe"|"moderate"|"avoid"):
+{{"estimated_calories":0,"macros":{{"protein_g":0,"carbs_g":0,"fat_g":0,"fiber_g":0}},"micronutrients":{{"iron_mg":0,"calcium_mg":0,"magnesium_mg":0,"potassium_mg":0,"vitamin_c_mg":0,"vitamin_b12_mcg":0}},"glycemic_index":0,"diet_suitability":{{"diabetic":S,"high_bp":S,"high_cholesterol":S,"weight_loss":S}},"overall_comment":"string"}}"""
 
-Foods: {labels}
-Conditions: {conditions}
-Nutrition: {nutrition}
 
+def diet_prompt(labels, nutrition, conditions):
+    facts = {k: nutrition[k] for k in DIET_NUTRITION_FIELDS if k in nutrition}
+    data = {"foods": labels, "conditions": conditions, "nutrition": round_numbers(facts)}
+    return f"""Only JSON response. Improve diet balance.
+Input: {compact_json(data)}
 Schema:
-{{
-  "add": ["foods to improve nutrition"],
-  "reduce": ["unhealthy parts"],
-  "pairings": ["healthy combinations"],
-  "overall_comment": "short advice"
-}}
-"""
+{{"add":["foods to improve nutrition"],"reduce":["unhealthy parts"],"pairings":["healthy combinations"],"overall_comment":"short advice"}}"""
@@ -0,0 +1,131 @@
+# backend/dietary_rules.py
+#
+# Dietary restriction rules (data/dietary_rules.json) compiled into a cached
+# matcher per preference set. Matching is token/phrase based on normalized
+# ingredient names, so "chicken breast" and "smoked bacon" are caught too.
+
+import os
+import re
+import json
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dietary_rules.json")
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3 or token.endswith("ss"):
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith("oes"):
+        return token[:-2]
+    if token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(name: str) -> Tuple[str, ...]:
+    return tuple(_singular(t) for t in _NON_WORD.sub(" ", name.lower()).split())
+
+
+def _load_rules(path: str = RULES_PATH) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+RULES = _load_rules()
+
+
+def normalize_preference(pref: str) -> str:
+    pref = " ".join(pref.lower().replace("-", " ").split())
+    return RULES.get("aliases", {}).get(pref, pref)
+
+
+class DietMatcher:
+    """
+    Precompiled restriction set: single-word terms in one frozenset, multi-word
+    terms as token tuples, plus "allow" phrases that mask their tokens first
+    (so "peanut butter" is not caught by the vegan "butter" rule).
+    """
+
+    def __init__(self, terms: Iterable[str], allow: Iterable[str]):
+        words, phrases = set(), set()
+        for term in terms:
+            toks = tokenize(term)
+            if len(toks) == 1:
+                words.add(toks[0])
+            elif toks:
+                phrases.add(toks)
+
+        self.words: FrozenSet[str] = frozenset(words)
+        self.phrases: FrozenSet[Tuple[str, ...]] = frozenset(phrases)
+        self.allow: FrozenSet[Tuple[str, ...]] = frozenset(t for t in map(tokenize, allow) if t)
+
+        lengths = [len(p) for p in self.phrases | self.allow]
+        self.max_len = max(lengths) if lengths else 1
+
+    def __bool__(self):
+        return bool(self.words or self.phrases)
+
+    def _ngrams(self, toks, masked):
+        for size in range(2, min(self.max_len, len(toks)) + 1):
+            for i in range(len(toks) - size + 1):
+                if not any(masked[i:i + size]):
+                    yield toks[i:i + size]
+
+    def violation(self, name: str) -> Optional[str]:
+        """Return the restricted term found in `name`, or None if it is allowed."""
+        if not self:
+            return None
+        toks = tokenize(name)
+        masked = [False] * len(toks)
+
+        for size in range(min(self.max_len, len(toks)), 0, -1):
+            for i in range(len(toks) - size + 1):
+                if toks[i:i + size] in self.allow:
+                    masked[i:i + size] = [True] * size
+
+        for i, tok in enumerate(toks):
+            if not masked[i] and tok in self.words:
+                return tok
+        for gram in self._ngrams(toks, masked):
+            if gram in self.phrases:
+                return " ".join(gram)
+        return None
+
+
+@lru_cache(maxsize=256)
+def _compile(prefs: FrozenSet[str]) -> DietMatcher:
+    rules = RULES["rules"]
+    terms, seen = [], set()
+
+    def collect(pref):
+        if pref in seen or pref not in rules:
+            return
+        seen.add(pref)
+        for parent in rules[pref].get("include", []):
+            collect(parent)
+        terms.extend(rules[pref].get("exclude", []))
+
+    for pref in prefs:
+        collect(pref)
+    return DietMatcher(terms, RULES.get("allow", []))
+
+
+def compile_rules(preferences: Optional[Iterable[str]]) -> DietMatcher:
+    """Cached matcher for a preference list; order and case do not matter."""
+    return _compile(frozenset(normalize_preference(p) for p in preferences or []))
+
+
+def violations(preferences: List[str], names: Iterable[str]) -> Dict[str, str]:
+    """{ingredient name: restricted term} for every name that breaks the preferences."""
+    matcher = compile_rules(preferences)
+    found = {}
+    for name in names:
+        term = matcher.violation(name)
+        if term:
+            found[name] = term
+    return found
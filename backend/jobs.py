@@ -0,0 +1,178 @@
+# jobs.py
+#
+# In-process background job queue for work the client does not need to wait
+# for (e.g. recipe nutrition enrichment).
+#   - handlers are registered per job kind; worker threads run them
+#   - the job id is a hash of (kind, payload), so submitting the same work
+#     twice returns the existing job instead of queueing a duplicate
+#   - queued/running jobs are persisted to data/jobs_pending.json and resumed
+#     at startup once their handler is registered again
+#   - finished jobs are kept in memory (bounded) for /api/jobs/{id}
+
+import os
+import json
+import time
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from singleflight import make_key
+
+JOBS_PATH = os.getenv(
+    "JOBS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs_pending.json"),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+JOB_POLL_S = 0.25  # SSE status poll interval
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    def __init__(self, path: str = JOBS_PATH, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._handlers: Dict[str, Callable[[Dict], Any]] = {}
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._started = False
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                pending = json.load(f)
+        except Exception as e:
+            print("JOBS LOAD ERROR:", e)
+            return
+        for job in pending:
+            # a job that was running at shutdown starts over
+            job.update(status=QUEUED, result=None, error=None, finished=None)
+            self._jobs[job["id"]] = job
+
+    def _persist(self):
+        """Write queued/running jobs; called with self._cond held."""
+        pending = [
+            {k: job[k] for k in ("id", "kind", "payload", "created")}
+            for job in self._jobs.values()
+            if job["status"] in (QUEUED, RUNNING)
+        ]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(pending, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print("JOBS SAVE ERROR:", e)
+
+    # ---------- API ----------
+
+    def register(self, kind: str, handler: Callable[[Dict], Any]):
+        """Set the handler for `kind` and resume any of its jobs left from a previous run."""
+        with self._cond:
+            self._handlers[kind] = handler
+            resumed = [j["id"] for j in self._jobs.values() if j["kind"] == kind and j["status"] == QUEUED]
+        for job_id in resumed:
+            self._queue.put(job_id)
+        self._start()
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        """Queue a job (or return the id of the identical one already known)."""
+        if kind not in self._handlers:
+            raise ValueError(f"no handler registered for job kind '{kind}'")
+
+        job_id = make_key(kind, json.dumps(payload, sort_keys=True, ensure_ascii=False))[:24]
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] != FAILED:
+                return job_id
+
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "payload": payload,
+                "status": QUEUED,
+                "result": None,
+                "error": None,
+                "created": time.time(),
+                "finished": None,
+            }
+            self._persist()
+        self._queue.put(job_id)
+        self._start()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return None if job is None else {k: v for k, v in job.items() if k != "payload"}
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the job has finished (or `timeout`), then return it."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._jobs.get(job_id, {}).get("status") not in (QUEUED, RUNNING), timeout
+            )
+        return self.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
+
+    # ---------- workers ----------
+
+    def _start(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+
+    def _finish(self, job: Dict, status: str, result=None, error=None):
+        with self._cond:
+            job.update(status=status, result=result, error=error, finished=time.time())
+            self._persist()
+
+            # Drop the oldest finished jobs beyond the cap
+            finished = [k for k, j in self._jobs.items() if j["status"] in (DONE, FAILED)]
+            for k in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._jobs[k]
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != QUEUED:
+                    continue
+                job["status"] = RUNNING
+                handler = self._handlers[job["kind"]]
+
+            try:
+                self._finish(job, DONE, result=handler(job["payload"]))
+            except Exception as e:
+                print("JOB ERROR:", job["kind"], job_id, e)
+                self._finish(job, FAILED, error=str(e))
+
+
+job_queue = JobQueue()
+
+
+def render_job_metrics() -> str:
+    lines = ["# TYPE background_jobs gauge"]
+    for status, count in job_queue.stats().items():
+        lines.append(f'background_jobs{{status="{status}"}} {count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+# live_scan.py
+#
+# Helpers for the /ws/freshness live camera stream.
+#   - FrameGate decides per frame whether YOLO needs to run: a small grayscale
+#     thumbnail is compared with the last detected frame (scene change) and the
+#     previous frame (camera still moving); while the view is static the
+#     refresh interval backs off exponentially
+#   - DetectionTracker matches detections across runs by IoU and smooths
+#     boxes and per-label scores with an EMA, so labels do not flicker
+#     between frames or between the two models
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+THUMB_SIZE = (32, 24)
+LIVE_MAX_SIDE = int(os.getenv("LIVE_MAX_SIDE", "640"))        # YOLO input is 640 anyway
+SCENE_DIFF = float(os.getenv("LIVE_SCENE_DIFF", "10"))        # mean abs diff (0-255) vs last detected frame
+MOTION_DIFF = float(os.getenv("LIVE_MOTION_DIFF", "14"))      # mean abs diff vs previous frame
+MIN_SKIP = int(os.getenv("LIVE_MIN_SKIP", "2"))               # frames between refreshes right after a change
+MAX_SKIP = int(os.getenv("LIVE_MAX_SKIP", "32"))              # longest a static view goes without a refresh
+
+IOU_MATCH = 0.3
+BOX_ALPHA = 0.5
+SCORE_ALPHA = 0.4
+MIN_HITS = 2      # runs before a track is reported as confirmed
+MAX_MISSES = 3    # runs a track survives without a match ("auto" alternates models)
+
+
+def decode_frame(data: bytes, max_side: int = LIVE_MAX_SIDE) -> Optional[np.ndarray]:
+    """JPEG/PNG/WebP bytes -> BGR array no larger than max_side, or None."""
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def thumbnail(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class FrameGate:
+    def __init__(self, scene_diff: float = SCENE_DIFF, motion_diff: float = MOTION_DIFF,
+                 min_skip: int = MIN_SKIP, max_skip: int = MAX_SKIP):
+        self.scene_diff = scene_diff
+        self.motion_diff = motion_diff
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.interval = min_skip
+        self.since = 0
+        self.ref: Optional[np.ndarray] = None    # thumbnail of the last detected frame
+        self.prev: Optional[np.ndarray] = None   # thumbnail of the previous frame
+
+    def check(self, frame: np.ndarray) -> Tuple[bool, str]:
+        """(run detection?, reason) for the next frame."""
+        thumb = thumbnail(frame)
+        prev, self.prev = self.prev, thumb
+        self.since += 1
+
+        if self.ref is None:
+            return self._run(thumb, "first")
+
+        change = float(np.abs(thumb - self.ref).mean())
+        motion = float(np.abs(thumb - prev).mean()) if prev is not None else 0.0
+
+        # Wait for the camera to settle; blurred frames give poor detections
+        if motion >= self.motion_diff and self.since < self.max_skip:
+            return False, "moving"
+        if change >= self.scene_diff:
+            self.interval = self.min_skip
+            return self._run(thumb, "scene_change")
+        if self.since >= self.interval:
+            self.interval = min(self.interval * 2, self.max_skip)
+            return self._run(thumb, "refresh")
+        return False, "static"
+
+    def _run(self, thumb: np.ndarray, reason: str) -> Tuple[bool, str]:
+        self.ref = thumb
+        self.since = 0
+        return True, reason
+
+    def reset(self):
+        self.__init__(self.scene_diff, self.motion_diff, self.min_skip, self.max_skip)
+
+
+def iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class DetectionTracker:
+    def __init__(self):
+        self.tracks: Dict[int, Dict] = {}
+        self.next_id = 1
+        self._sent: Dict[int, Tuple] = {}   # last reported summary per track
+
+    def update(self, labels: List[str], confs: Dict[str, float], boxes: Dict[str, list]) -> None:
+        """Fold one detect_best_conf() result into the tracks."""
+        dets = [(lbl, confs[lbl], [float(v) for v in boxes[lbl]]) for lbl in labels]
+
+        pairs = sorted(
+            ((iou(t["box"], box), tid, d) for tid, t in self.tracks.items() for d, (_, _, box) in enumerate(dets)),
+            reverse=True,
+        )
+        used_tracks, used_dets = set(), set()
+        for score, tid, d in pairs:
+            if score < IOU_MATCH:
+                break
+            if tid in used_tracks or d in used_dets:
+                continue
+            used_tracks.add(tid)
+            used_dets.add(d)
+            self._match(self.tracks[tid], *dets[d])
+
+        for tid in list(self.tracks):
+            if tid not in used_tracks:
+                track = self.tracks[tid]
+                track["misses"] += 1
+                if track["misses"] > MAX_MISSES:
+                    del self.tracks[tid]
+
+        for d, (label, conf, box) in enumerate(dets):
+            if d not in used_dets:
+                self.tracks[self.next_id] = {
+                    "id": self.next_id, "box": box, "scores": {label: conf}, "hits": 1, "misses": 0,
+                }
+                self.next_id += 1
+
+    @staticmethod
+    def _match(track: Dict, label: str, conf: float, box: list):
+        track["box"] = [BOX_ALPHA * n + (1 - BOX_ALPHA) * o for n, o in zip(box, track["box"])]
+        scores = track["scores"]
+        for lbl in scores:
+            scores[lbl] *= 1 - SCORE_ALPHA
+        scores[label] = scores.get(label, 0.0) + SCORE_ALPHA * conf
+        track["hits"] += 1
+        track["misses"] = 0
+
+    @staticmethod
+    def summary(track: Dict) -> Dict:
+        label, score = max(track["scores"].items(), key=lambda kv: kv[1])
+        return {
+            "id": track["id"],
+            "label": label,
+            "confidence": round(score, 2),
+            "box": [int(round(v)) for v in track["box"]],
+            "confirmed": track["hits"] >= MIN_HITS,
+        }
+
+    def snapshot(self) -> List[Dict]:
+        return [self.summary(t) for t in self.tracks.values()]
+
+    def changes(self) -> Dict[str, list]:
+        """Tracks added / updated / removed since the last call (for incremental pushes)."""
+        current = {tid: self.summary(t) for tid, t in self.tracks.items()}
+        added, updated = [], []
+        for tid, s in current.items():
+            key = (s["label"], s["confidence"], tuple(s["box"]), s["confirmed"])
+            if tid not in self._sent:
+                added.append(s)
+            elif self._sent[tid] != key:
+                updated.append(s)
+            self._sent[tid] = key
+        removed = [tid for tid in self._sent if tid not in current]
+        for tid in removed:
+            del self._sent[tid]
+        return {"added": added, "updated": updated, "removed": removed}
+
+    def reset(self):
+        self.__init__()
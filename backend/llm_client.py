@@ -2,14 +2,11 @@
 # llm_client.py
 
 import json, os
-import requests
 from datetime import datetime
-from config import GROQ_API_KEY, GROQ_API_BASE, LLM_MODEL, LLM_MAX_TOKENS
-
-headers = {
-    "Authorization": f"Bearer {GROQ_API_KEY}",
-    "Content-Type": "application/json"
-}
+from config import LLM_MAX_TOKENS
+from singleflight import SingleFlight, make_key
+from llm_router import router
+from admission import Overloaded
 
 os.makedirs("logs", exist_ok=True)
 
@@ -20,20 +17,31 @@ def _save_log(text, name):
         f.write(text)
 
 
-def call_llm(prompt: str):
-    payload = {
-        "model": LLM_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": LLM_MAX_TOKENS,
-        "temperature": 0.2,
-    }
+# Identical prompts that are in flight at the same time share one upstream call
+_inflight = SingleFlight()
+
+
+def _normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def call_llm(prompt: str, max_tokens: int = None, prompt_type: str = None):
+    """
+    max_tokens caps the completion for this schema (never above LLM_MAX_TOKENS).
+    prompt_type (an OUTPUT_TOKENS key) lets the router pick a faster model.
+    """
+    max_tokens = min(max_tokens or LLM_MAX_TOKENS, LLM_MAX_TOKENS)
+    key = make_key(prompt_type, max_tokens, _normalize_prompt(prompt))
+    return _inflight.do(key, lambda: _call_llm(prompt, max_tokens, prompt_type))
+
 
+def _call_llm(prompt: str, max_tokens: int, prompt_type: str = None):
     try:
-        r = requests.post(f"{GROQ_API_BASE}/chat/completions", json=payload, headers=headers, timeout=25)
-        r.raise_for_status()
-        text = r.json()["choices"][0]["message"]["content"]
+        text = router.complete(prompt, max_tokens, prompt_type)
         _save_log(text, "success")
         return json.loads(text)
+    except Overloaded:
+        raise   # shed: the route answers 503 / degrades instead of an empty result
     except Exception as e:
         _save_log(str(e), "error")
         print("LLM ERROR:", e)
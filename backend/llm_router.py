@@ -0,0 +1,338 @@
+# llm_router.py
+#
+# Routing for OpenAI-compatible chat endpoints (Groq, a local llama.cpp /
+# vLLM server, ...).
+#   - providers come from LLM_PROVIDERS (JSON list) or, by default, the single
+#     GROQ_API_BASE / LLM_MODEL from config
+#   - each provider keeps rolling latency / error stats; the healthiest and
+#     fastest one is tried first, the others are failovers
+#   - if the primary has not answered by its p95 latency, one hedged duplicate
+#     is sent (to the next provider, or the same one if there is only one);
+#     the first answer wins and the loser's socket is shut down
+#   - small prompt types can be sent to a faster model per provider
+#
+# LLM_PROVIDERS example:
+#   [{"name": "groq", "base": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY",
+#     "model": "llama-3.3-70b-versatile", "models": {"shelf_life": "llama-3.1-8b-instant"}},
+#    {"name": "local", "base": "http://127.0.0.1:8080/v1", "model": "qwen2.5-7b-instruct", "timeout": 30}]
+
+import os
+import json
+import time
+import socket
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import GROQ_API_KEY, GROQ_API_BASE, LLM_MODEL
+from telemetry import span
+from admission import LIMITERS, upstream_timeout, remaining
+
+STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+MIN_SAMPLES = 20                                               # before p95 is trusted
+HEDGE_DEFAULT_S = float(os.getenv("LLM_HEDGE_DEFAULT_S", "4"))  # hedge delay until then
+HEDGE_MIN_S = float(os.getenv("LLM_HEDGE_MIN_S", "0.25"))
+HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))      # hedges per primary request
+UPSTREAM_TIMEOUT_S = 25
+
+# Prompt types that do fine on a smaller, faster model (LLM_FAST_MODEL)
+FAST_PROMPT_TYPES = ("shelf_life", "replacement", "diet")
+
+
+class Provider:
+    def __init__(self, name: str, base: str, api_key: str, model: str,
+                 models: Optional[Dict[str, str]] = None, timeout: float = UPSTREAM_TIMEOUT_S):
+        self.name = name
+        self.base = base.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.models = models or {}
+        self.timeout = timeout
+
+        self.latencies = deque(maxlen=STATS_WINDOW)   # seconds, successful or cancelled calls
+        self.outcomes = deque(maxlen=STATS_WINDOW)    # 1 = error, 0 = ok
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.wins_as_hedge = 0
+        self._lock = threading.Lock()
+
+    def model_for(self, prompt_type: Optional[str]) -> str:
+        return self.models.get(prompt_type, self.model)
+
+    def record(self, seconds: Optional[float], error: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.outcomes.append(int(error))
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def record_latency(self, seconds: float):
+        """Latency-only sample (a cancelled hedge loser): no success or error is counted."""
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            return float(np.quantile(np.fromiter(self.latencies, float), q))
+
+    def hedge_delay(self) -> float:
+        p95 = self.quantile(0.95)
+        return HEDGE_DEFAULT_S if p95 is None else max(HEDGE_MIN_S, p95)
+
+    def score(self) -> float:
+        """
+        Lower is better: expected seconds per call, i.e. median latency plus
+        the error rate times the timeout a failed call can cost. Providers
+        without enough samples are assumed to take HEDGE_DEFAULT_S.
+        """
+        p50 = self.quantile(0.5)
+        return (p50 if p50 is not None else HEDGE_DEFAULT_S) + self.error_rate() * self.timeout
+
+
+def load_providers() -> List[Provider]:
+    raw = os.getenv("LLM_PROVIDERS")
+    if raw:
+        providers = []
+        for i, cfg in enumerate(json.loads(raw)):
+            key = cfg.get("api_key") or os.getenv(cfg.get("api_key_env", ""), "")
+            providers.append(Provider(
+                cfg.get("name", f"provider{i}"), cfg["base"], key, cfg["model"],
+                cfg.get("models"), float(cfg.get("timeout", UPSTREAM_TIMEOUT_S)),
+            ))
+        return providers
+
+    fast = os.getenv("LLM_FAST_MODEL")
+    models = {t: fast for t in FAST_PROMPT_TYPES} if fast else {}
+    return [Provider("default", GROQ_API_BASE, GROQ_API_KEY, LLM_MODEL, models)]
+
+
+# =========================
+# CANCELLABLE HTTP
+# =========================
+
+class _CancellableAdapter(HTTPAdapter):
+    """Remembers the connections it opens so another thread can shut them down."""
+
+    def __init__(self):
+        super().__init__(max_retries=0)
+        self.conns = []
+        self.cancelled = False
+
+    def _track(self, pool):
+        if not getattr(pool, "_tracked", False):
+            new_conn = pool._new_conn
+
+            def tracked():
+                conn = new_conn()
+                self.conns.append(conn)
+                return conn
+
+            pool._new_conn = tracked
+            pool._tracked = True
+        return pool
+
+    def get_connection_with_tls_context(self, *args, **kwargs):
+        return self._track(super().get_connection_with_tls_context(*args, **kwargs))
+
+    def cancel(self):
+        self.cancelled = True
+        for conn in self.conns:
+            sock = getattr(conn, "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class _Attempt:
+    def __init__(self, provider: Provider, hedge: bool):
+        self.provider = provider
+        self.hedge = hedge
+        self.adapter = _CancellableAdapter()
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.started = None
+
+    def run(self, prompt: str, max_tokens: int, prompt_type: Optional[str]) -> str:
+        p = self.provider
+        payload = {
+            "model": p.model_for(prompt_type),
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.2,
+        }
+        headers = {"Authorization": f"Bearer {p.api_key}", "Content-Type": "application/json"}
+
+        with LIMITERS["llm"].slot(), span("llm_hedge" if self.hedge else "llm_upstream"):
+            if self.adapter.cancelled:
+                raise RuntimeError("cancelled before start")
+            self.started = time.monotonic()
+            try:
+                r = self.session.post(
+                    f"{p.base}/chat/completions", json=payload, headers=headers,
+                    timeout=upstream_timeout(p.timeout),
+                )
+                r.raise_for_status()
+                text = r.json()["choices"][0]["message"]["content"]
+            except Exception:
+                if not self.adapter.cancelled:
+                    p.record(time.monotonic() - self.started, error=True)
+                raise
+            finally:
+                self.session.close()
+
+        if not self.adapter.cancelled:
+            p.record(time.monotonic() - self.started, error=False)
+        return text
+
+    def cancel(self):
+        # A cancelled loser ran at least this long; keep it in the window so
+        # the p95 does not drift down to only the requests that were fast
+        if self.started is not None:
+            self.provider.record_latency(time.monotonic() - self.started)
+        self.adapter.cancel()
+
+
+# =========================
+# ROUTER
+# =========================
+
+class LLMRouter:
+    def __init__(self, providers: List[Provider], hedge_budget: float = HEDGE_BUDGET):
+        self.providers = providers
+        self.hedge_budget = hedge_budget
+        self.hedge_tokens = 1.0 if hedge_budget > 0 else 0.0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm")
+
+    def ranked(self) -> List[Provider]:
+        return sorted(self.providers, key=lambda p: p.score())
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self.hedge_tokens >= 1:
+                self.hedge_tokens -= 1
+                return True
+            return False
+
+    def _start(self, provider, hedge, prompt, max_tokens, prompt_type):
+        attempt = _Attempt(provider, hedge)
+        # Copy the request context so spans and the deadline follow the call
+        ctx = contextvars.copy_context()
+        future = self._pool.submit(ctx.run, attempt.run, prompt, max_tokens, prompt_type)
+        return future, attempt
+
+    def complete(self, prompt: str, max_tokens: int, prompt_type: Optional[str] = None) -> str:
+        """
+        Content of the first successful completion. Failed providers fail
+        over to the next one; a slow primary gets one hedged duplicate.
+        Raises the last error if every provider failed.
+        """
+        order = self.ranked()
+        with self._lock:
+            self.hedge_tokens = min(10.0, self.hedge_tokens + self.hedge_budget)
+
+        pending = {}
+        future, attempt = self._start(order[0], False, prompt, max_tokens, prompt_type)
+        pending[future] = attempt
+        hedge_at = time.monotonic() + order[0].hedge_delay()
+        next_idx, hedged, last_error = 1, False, None
+
+        while pending:
+            timeout = None if hedged else max(0.0, hedge_at - time.monotonic())
+            left = remaining()
+            if left is not None:
+                timeout = max(0.0, left) if timeout is None else min(timeout, max(0.0, left))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                for other in pending.values():
+                    other.cancel()
+                if attempt.hedge:
+                    attempt.provider.wins_as_hedge += 1
+                return text
+
+            if not done and left is not None and left <= 0:
+                break   # request deadline passed; limiter/timeout will clean up
+
+            # Failover: nothing left in flight, try the next provider
+            if not pending and next_idx < len(order):
+                future, attempt = self._start(order[next_idx], False, prompt, max_tokens, prompt_type)
+                pending[future] = attempt
+                next_idx += 1
+                hedge_at = time.monotonic() + attempt.provider.hedge_delay()
+                continue
+
+            # Hedge: primary is past its p95 and the upstream has room
+            if (not done and not hedged and pending and time.monotonic() >= hedge_at
+                    and not LIMITERS["llm"].busy() and self._take_hedge_token()):
+                hedged = True
+                target = order[next_idx] if next_idx < len(order) else order[0]
+                next_idx += next_idx < len(order)
+                target.hedges += 1
+                future, attempt = self._start(target, True, prompt, max_tokens, prompt_type)
+                pending[future] = attempt
+            elif not done and not hedged and time.monotonic() >= hedge_at:
+                hedged = True   # no hedge budget / room: just wait for the primary
+
+        for attempt in pending.values():
+            attempt.cancel()
+        raise last_error or TimeoutError("LLM request deadline exceeded")
+
+    def stats(self) -> List[Dict]:
+        return [
+            {
+                "provider": p.name,
+                "requests": p.requests,
+                "errors": p.errors,
+                "error_rate": round(p.error_rate(), 3),
+                "p50_s": p.quantile(0.5),
+                "p95_s": p.quantile(0.95),
+                "hedges": p.hedges,
+                "hedge_wins": p.wins_as_hedge,
+            }
+            for p in self.providers
+        ]
+
+
+router = LLMRouter(load_providers())
+
+
+def render_router_metrics() -> str:
+    lines = []
+    for metric, kind, attr in (
+        ("llm_provider_requests_total", "counter", "requests"),
+        ("llm_provider_errors_total", "counter", "errors"),
+        ("llm_provider_hedges_total", "counter", "hedges"),
+        ("llm_provider_hedge_wins_total", "counter", "wins_as_hedge"),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        for p in router.providers:
+            lines.append(f'{metric}{{provider="{p.name}"}} {getattr(p, attr)}')
+    lines.append("# TYPE llm_provider_p95_seconds gauge")
+    for p in router.providers:
+        p95 = p.quantile(0.95)
+        if p95 is not None:
+            lines.append(f'llm_provider_p95_seconds{{provider="{p.name}"}} {p95:.4f}')
+    return "\n".join(lines) + "\n"
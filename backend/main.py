@@ -1,16 +1,33 @@
 # main.py
+import json
+import time
+import asyncio
 import uvicorn
 import cv2, numpy as np
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from typing import Optional
+from datetime import date, datetime, time as dt_time, timedelta
 from PIL import Image
 
 # Nutrition + Vision imports
-from multi_model_detection import detect_best_conf
+from multi_model_detection import detect_best_conf, detect_with_route
 from vision import annotate, encode_base64
+from live_scan import FrameGate, DetectionTracker, decode_frame
+from telemetry import span, render_metrics, TimingMiddleware
+from meal_history import meal_history
+from recipe_store import recipe_store
+from jobs import job_queue, render_job_metrics, JOB_POLL_S
+from llm_router import render_router_metrics
+from serialization import FastJSONResponse, CompressionMiddleware, dump
+from admission import (
+    DeadlineMiddleware, Overloaded, overloaded_handler, LIMITERS, render_limiter_metrics,
+    should_skip, remaining, set_deadline, NUTRITION_MIN_S, DIET_MIN_S, ANNOTATE_MIN_S, FRAME_BUDGET_S,
+)
 from analysis_pipeline import (
-    analyze_nutrition, analyze_diet, compute_health_score, missing_nutrients
+    analyze_nutrition, analyze_diet, compute_health_score, missing_nutrients, cached_nutrition
 )
 
 # Recipe imports
@@ -19,22 +36,39 @@ from recipe_models import (
     RecipeUpdateRequest,
     RecipeReplaceRequest,
     RecipeSaveRequest,
+    RecipeSuggestRequest,
 )
 from recipe_pipeline import (
     generate_recipe,
     adjust_recipe,
+    rewrite_recipe_steps,
     suggest_replacement,
+    suggest_from_inventory,
 )
 
-app = FastAPI()
+# Inventory routes (bill OCR needs the optional mistralai client)
+try:
+    from rima.inventory_routes import router as inventory_router
+except ImportError as e:
+    inventory_router = None
+    print("INVENTORY ROUTES DISABLED:", e)
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(TimingMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_exception_handler(Overloaded, overloaded_handler)
+if inventory_router is not None:
+    app.include_router(inventory_router)
 
 
 # =========================
@@ -47,17 +81,41 @@ async def analyze(
     conditions: str = Form(""),
     description: str = Form(""),
     model_type: str = Form("auto"),
+    user_id: str = Form(""),
 ):
+    cond_list = [c.strip() for c in conditions.split(",") if c.strip()]
+
+    data = None
+    if file:
+        with span("upload_read"):
+            data = await file.read()
+
+    # Detection and the LLM calls block; keep them off the event loop so a slow
+    # upstream (or a full limiter queue) does not stall every other request.
+    result = await run_in_threadpool(
+        _analyze, data, portion, cond_list, description, model_type, user_id
+    )
+    # Returning the response directly skips jsonable_encoder over the base64 image
+    return FastJSONResponse(result)
+
+
+def _analyze(data, portion, cond_list, description, model_type, user_id):
     labels = []
     boxes = {}
     confs = {}
+    route = None    # detector cascade path taken
+    degraded = []   # stages skipped or served from cache under load
 
-    cond_list = [c.strip() for c in conditions.split(",") if c.strip()]
-
-    if file:
-        img_arr = np.frombuffer(await file.read(), np.uint8)
-        img = cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
-        labels, confs, boxes = detect_best_conf(img, model_type)
+    if data:
+        with span("decode"):
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        with span("detect"):
+            try:
+                labels, confs, boxes, route = detect_with_route(img, model_type)
+            except Overloaded:
+                if not description.strip():
+                    raise
+                degraded.append("detection")
 
     if description.strip():
         labels.extend([x.strip().lower() for x in description.split(",")])
@@ -67,17 +125,49 @@ async def analyze(
     if not labels:
         return {"detected_food": [], "error": "No food detected"}
 
-    nutrition = analyze_nutrition(labels, portion, cond_list)
+    with span("nutrition_llm"):
+        nutrition = None
+        if should_skip("llm", NUTRITION_MIN_S):
+            nutrition = cached_nutrition(labels, portion, cond_list)
+            if nutrition is not None:
+                degraded.append("nutrition_cached")
+        if nutrition is None:
+            try:
+                nutrition = analyze_nutrition(labels, portion, cond_list)
+            except Overloaded:
+                nutrition = {}
+            if not nutrition:
+                nutrition = cached_nutrition(labels, portion, cond_list) or {}
+                degraded.append("nutrition_cached" if nutrition else "nutrition")
     nutrition["detected_food"] = labels
 
-    score = compute_health_score(nutrition)
-    missing = missing_nutrients(nutrition)
-    diet = analyze_diet(labels, nutrition, cond_list)
+    with span("scoring"):
+        score = compute_health_score(nutrition)
+        missing = missing_nutrients(nutrition)
+    diet = {}
+    if should_skip("llm", DIET_MIN_S):
+        degraded.append("diet")
+    else:
+        with span("diet_llm"):
+            try:
+                diet = analyze_diet(labels, nutrition, cond_list)
+            except Overloaded:
+                degraded.append("diet")
+
+    if user_id and nutrition.get("estimated_calories") is not None:
+        with span("meal_log"):
+            meal_history.log_meal(user_id, labels, nutrition, score)
 
     annotated_img = None
-    if boxes:
-        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        annotated_img = encode_base64(annotate(pil_img, boxes, confs))
+    left = remaining()
+    if boxes and ((left is not None and left < ANNOTATE_MIN_S) or LIMITERS["detector"].waiting):
+        degraded.append("annotation")
+    elif boxes:
+        with span("annotate"):
+            pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            pil_img = annotate(pil_img, boxes, confs)
+        with span("encode_base64"):
+            annotated_img = encode_base64(pil_img)
 
     return {
         "detected_food": labels,
@@ -91,42 +181,149 @@ async def analyze(
         "health_score": score,
         "missing_nutrients": missing,
         "image_with_boxes": annotated_img,
+        "detector_path": route,
+        "partial": bool(degraded),
+        "degraded": degraded,
     }
 
 
+# =========================
+# LIVE FRESHNESS SCAN (WEBSOCKET)
+# =========================
+@app.websocket("/ws/freshness")
+async def ws_freshness(ws: WebSocket, model_type: str = "auto"):
+    """
+    Binary messages are camera frames (JPEG/PNG/WebP). YOLO only runs when
+    FrameGate sees a new or changed view, one detection at a time; frames that
+    arrive meanwhile are dropped. In "auto" mode runs alternate between the
+    two models and the tracker merges them. After each run the server sends
+    {"type": "update", "added", "updated", "removed", ...} if anything changed.
+    A text message {"type": "reset"} clears the tracks.
+    """
+    await ws.accept()
+    gate, tracker = FrameGate(), DetectionTracker()
+    stats = {"frames": 0, "detections": 0, "skipped": 0}
+    runs = 0
+    inflight: Optional[asyncio.Task] = None
+
+    async def detect(frame, frame_no, reason, model):
+        set_deadline(FRAME_BUDGET_S)   # own task context, so this only bounds this frame's detector wait
+        try:
+            labels, confs, boxes = await run_in_threadpool(detect_best_conf, frame, model)
+        except Overloaded:
+            gate.reset()   # try again on the next frame
+            return
+        except Exception as e:
+            print("LIVE SCAN ERROR:", e)
+            await ws.send_json({"type": "error", "detail": str(e)})
+            return
+
+        tracker.update(labels, confs, boxes)
+        changes = tracker.changes()
+        if any(changes.values()):
+            await ws.send_json({
+                "type": "update", "frame": frame_no, "reason": reason, "model": model, **changes, "stats": stats,
+            })
+
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            if msg.get("text"):
+                try:
+                    control = json.loads(msg["text"])
+                except ValueError:
+                    continue
+                if isinstance(control, dict) and control.get("type") == "reset":
+                    gate.reset()
+                    tracker.reset()
+                continue
+            if not msg.get("bytes"):
+                continue
+
+            stats["frames"] += 1
+            if inflight is not None and not inflight.done():
+                stats["skipped"] += 1   # detector still busy with an earlier frame
+                continue
+
+            frame = await run_in_threadpool(decode_frame, msg["bytes"])
+            if frame is None:
+                await ws.send_json({"type": "error", "detail": "Could not decode frame"})
+                continue
+
+            run, reason = gate.check(frame)
+            if not run:
+                stats["skipped"] += 1
+                continue
+
+            model = model_type
+            if model_type == "auto":
+                model = ("indian", "western")[runs % 2]
+            runs += 1
+            stats["detections"] += 1
+            inflight = asyncio.create_task(detect(frame, stats["frames"], reason, model))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if inflight is not None:
+            inflight.cancel()
+
+
 # =========================
 # RECIPE GENERATION ROUTES
 # =========================
 @app.post("/api/recipe/generate")
 def api_generate_recipe(req: RecipeGenerateRequest):
     try:
-        print("REQ:", req.dict())
-        return generate_recipe(req.dish, req.servings, req.preferences)
+        print("REQ:", dump(req))
+        with span("recipe_generate"):
+            return FastJSONResponse(generate_recipe(
+                req.dish, req.servings, req.preferences, regenerate=req.regenerate
+            ))
+    except Overloaded:
+        raise
     except Exception as e:
         print("BACKEND ERROR:", e)  # <-- ADD THIS
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/recipe/update")
-def api_update_recipe(req: RecipeUpdateRequest):
+async def api_update_recipe(req: RecipeUpdateRequest):
     try:
-        recipe_dict = req.recipe.dict()
-        excluded_items = req.excluded_items or []
-        added_items = [i.dict() for i in req.added_items] if req.added_items else []
+        data = dump(req)   # one dump for the whole request instead of per model
+        recipe_dict = data["recipe"]
+        excluded_items = data["excluded_items"] or []
+        added_items = data["added_items"] or []
         preferences = req.preferences or []
 
-        updated_recipe = adjust_recipe(
-            recipe_dict,
-            excluded_items,
-            added_items,
-            preferences,
-        )
+        # local, deterministic edit — no LLM round-trip
+        with span("adjust_local"):
+            updated_recipe = adjust_recipe(
+                recipe_dict,
+                excluded_items,
+                added_items,
+                preferences,
+                servings=req.servings,
+            )
+
+        if req.rewrite_steps:
+            with span("rewrite_steps_llm"):
+                updated_recipe = await run_in_threadpool(
+                    rewrite_recipe_steps,
+                    updated_recipe,
+                    excluded_items,
+                    added_items,
+                    preferences,
+                )
 
         # ensure nutrition key exists even if empty
         updated_recipe["nutrition"] = updated_recipe.get("nutrition", {})
 
-        return updated_recipe
+        return FastJSONResponse(updated_recipe)
 
+    except Overloaded:
+        raise
     except Exception as e:
         print("BACKEND ERROR:", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -136,19 +333,138 @@ def api_update_recipe(req: RecipeUpdateRequest):
 @app.post("/api/recipe/replace")
 def api_replace_ingredient(req: RecipeReplaceRequest):
     try:
-        return suggest_replacement(
-            req.ingredient_name,
-            req.recipe.dict(),
-            req.preferences
-        )
+        with span("recipe_replace"):
+            return FastJSONResponse(suggest_replacement(
+                req.ingredient_name,
+                dump(req.recipe),
+                req.preferences
+            ))
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/recipe/suggest")
+def api_suggest_recipes(req: RecipeSuggestRequest):
+    try:
+        with span("recipe_suggest"):
+            return FastJSONResponse(suggest_from_inventory(
+                dump(req)["items"],
+                req.preferences,
+                top_k=req.top_k,
+                expand=req.expand,
+                servings=req.servings,
+            ))
+    except Overloaded:
+        raise
+    except Exception as e:
+        print("BACKEND ERROR:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/recipe/save")
 def api_save_recipe(req: RecipeSaveRequest):
-    # TODO: Add database save later
-    return {"status": "saved"}
+    try:
+        saved = recipe_store.save(dump(req.recipe), user_id=req.user_id)
+        return {"status": "saved", **saved}
+    except Exception as e:
+        print("BACKEND ERROR:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/recipe/search")
+def api_search_recipes(q: str, user_id: Optional[str] = None, limit: int = 20):
+    return {"results": recipe_store.search(q, user_id=user_id, limit=min(limit, 100))}
+
+
+@app.get("/api/recipe/collection/{user_id}")
+def api_recipe_collection(user_id: str):
+    return {"recipes": recipe_store.collection(user_id)}
+
+
+@app.delete("/api/recipe/collection/{user_id}/{recipe_id}")
+def api_remove_from_collection(user_id: str, recipe_id: str):
+    if not recipe_store.remove(user_id, recipe_id):
+        raise HTTPException(status_code=404, detail="Recipe not in collection")
+    return {"status": "removed"}
+
+
+@app.get("/api/recipe/{recipe_id}")
+def api_get_recipe(recipe_id: str):
+    recipe = recipe_store.get(recipe_id)
+    if recipe is None:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return recipe
+
+
+# =========================
+# MEAL HISTORY ROUTES
+# =========================
+@app.get("/api/meals/{user_id}/rollups")
+def api_meal_rollups(
+    user_id: str,
+    period: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    if period not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="period must be 'day' or 'week'")
+    return {"period": period, "rollups": meal_history.rollups(user_id, period, start, end)}
+
+
+@app.get("/api/meals/{user_id}/history")
+def api_meal_history(user_id: str, start: Optional[date] = None, end: Optional[date] = None):
+    start_ts = datetime.combine(start, dt_time.min).timestamp() if start else None
+    end_ts = datetime.combine(end + timedelta(days=1), dt_time.min).timestamp() if end else None
+    return FastJSONResponse(meal_history.history(user_id, start_ts, end_ts))
+
+
+# =========================
+# BACKGROUND JOBS
+# =========================
+@app.get("/api/jobs/{job_id}")
+def api_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def api_job_events(job_id: str, timeout: float = 60):
+    """Server-Sent Events: a `status` event on every change, then `done`/`failed` with the job."""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last = None
+        give_up = time.monotonic() + min(timeout, 300)
+        while time.monotonic() < give_up:
+            job = job_queue.get(job_id)
+            if job is None:
+                break
+            if job["status"] in ("done", "failed"):
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            if job["status"] != last:
+                last = job["status"]
+                yield f"event: status\ndata: {json.dumps({'id': job_id, 'status': last})}\n\n"
+            await asyncio.sleep(JOB_POLL_S)
+        yield "event: timeout\ndata: {}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# =========================
+# METRICS
+# =========================
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(
+        render_metrics() + render_limiter_metrics() + render_job_metrics() + render_router_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
 
 
 # =========================
@@ -0,0 +1,218 @@
+# meal_history.py
+#
+# Per-user meal log for /analyze results.
+#   - nutrients are kept column-wise in growable NumPy arrays (one row per meal)
+#   - per-day and per-week sums are updated on every insert, so dashboard range
+#     queries read a handful of rollup rows instead of re-scoring every meal
+#   - each user's log is persisted as append-only JSON lines and loaded lazily
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis_pipeline import (
+    junk_penalty,
+    compute_health_score_batch,
+    missing_nutrients_batch,
+    MISSING_RULES,
+)
+
+HISTORY_DIR = os.getenv(
+    "MEAL_HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "meals"),
+)
+
+MACROS = ("protein_g", "carbs_g", "fat_g", "fiber_g")
+MICROS = ("iron_mg", "calcium_mg", "magnesium_mg", "potassium_mg", "vitamin_c_mg", "vitamin_b12_mcg")
+
+COLUMNS = (
+    ("calories",) + MACROS + MICROS
+    + ("micro_fiber_g", "glycemic_index", "n_micros", "suit_good", "suit_bad", "junk_penalty", "health_score")
+)
+COL = {name: i for i, name in enumerate(COLUMNS)}
+
+# Columns that make sense to add up per day / week
+SUMMED = ("calories",) + MACROS + MICROS
+SUMMED_IDX = np.array([COL[c] for c in SUMMED])
+
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def nutrition_row(labels: List[str], nutrition: Dict, score: Optional[int] = None) -> np.ndarray:
+    """Flatten one /analyze nutrition dict into a COLUMNS row (NaN = not reported)."""
+    row = np.full(len(COLUMNS), np.nan)
+    macros = nutrition.get("macros", {}) or {}
+    micros = nutrition.get("micronutrients", {}) or {}
+    suit = nutrition.get("diet_suitability", {}) or {}
+
+    row[COL["calories"]] = _num(nutrition.get("estimated_calories"))
+    for k in MACROS:
+        row[COL[k]] = _num(macros.get(k))
+    for k in MICROS:
+        row[COL[k]] = _num(micros.get(k))
+    row[COL["micro_fiber_g"]] = _num(micros.get("fiber_g"))
+    row[COL["glycemic_index"]] = _num(nutrition.get("glycemic_index"))
+    row[COL["n_micros"]] = len(micros)
+    row[COL["suit_good"]] = sum(1 for v in suit.values() if v == "good")
+    row[COL["suit_bad"]] = sum(1 for v in suit.values() if v == "restricted")
+    row[COL["junk_penalty"]] = junk_penalty(labels)
+    row[COL["health_score"]] = np.nan if score is None else score
+    return row
+
+
+class UserMeals:
+    """Column store + rollups for one user."""
+
+    def __init__(self):
+        self.n = 0
+        self.ts = np.zeros(64)                        # epoch seconds
+        self.values = np.full((64, len(COLUMNS)), np.nan)
+        self.labels: List[List[str]] = []
+        self.daily: Dict[date, np.ndarray] = {}       # day -> [sums..., meals, score_sum]
+        self.weekly: Dict[date, np.ndarray] = {}      # monday -> same layout
+
+    def _grow(self):
+        cap = len(self.ts) * 2
+        self.ts = np.resize(self.ts, cap)
+        values = np.full((cap, len(COLUMNS)), np.nan)
+        values[:self.n] = self.values[:self.n]
+        self.values = values
+
+    def _bump(self, table: Dict[date, np.ndarray], key: date, row: np.ndarray):
+        acc = table.get(key)
+        if acc is None:
+            acc = table[key] = np.zeros(len(SUMMED) + 2)
+        acc[:len(SUMMED)] += np.nan_to_num(row[SUMMED_IDX])
+        acc[-2] += 1
+        acc[-1] += np.nan_to_num(row[COL["health_score"]])
+
+    def add(self, ts: float, labels: List[str], row: np.ndarray):
+        if self.n == len(self.ts):
+            self._grow()
+        self.ts[self.n] = ts
+        self.values[self.n] = row
+        self.labels.append(labels)
+        self.n += 1
+
+        day = datetime.fromtimestamp(ts).date()
+        self._bump(self.daily, day, row)
+        self._bump(self.weekly, day - timedelta(days=day.weekday()), row)
+
+    def columns(self, lo: int = 0, hi: Optional[int] = None) -> Dict[str, np.ndarray]:
+        hi = self.n if hi is None else hi
+        return {name: self.values[lo:hi, i] for i, name in enumerate(COLUMNS)}
+
+    def span(self, start: Optional[float], end: Optional[float]):
+        """Row range for [start, end) — meals are appended in time order."""
+        ts = self.ts[:self.n]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = self.n if end is None else int(np.searchsorted(ts, end, side="left"))
+        return lo, hi
+
+
+class MealHistory:
+    def __init__(self, directory: str = HISTORY_DIR):
+        self.directory = directory
+        self._users: Dict[str, UserMeals] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, user_id: str) -> str:
+        # Hashed, not sanitized: "a.b" and "ab" must not share a log file
+        digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{digest}.jsonl")
+
+    def _user(self, user_id: str) -> UserMeals:
+        meals = self._users.get(user_id)
+        if meals is not None:
+            return meals
+
+        meals = UserMeals()
+        path = self._path(user_id)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    row = np.array([np.nan if v is None else v for v in rec["values"]], dtype=float)
+                    meals.add(rec["ts"], rec["labels"], row)
+        self._users[user_id] = meals
+        return meals
+
+    def log_meal(self, user_id: str, labels: List[str], nutrition: Dict,
+                 score: Optional[int] = None, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        row = nutrition_row(labels, nutrition, score)
+        with self._lock:
+            meals = self._user(user_id)
+            if meals.n and ts < meals.ts[meals.n - 1]:
+                ts = meals.ts[meals.n - 1]   # keep rows sorted for range queries
+            meals.add(ts, labels, row)
+
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(user_id), "a", encoding="utf-8") as f:
+                values = [None if np.isnan(v) else float(v) for v in row]
+                f.write(json.dumps({"ts": ts, "labels": labels, "values": values}) + "\n")
+
+    # ---------- queries ----------
+
+    def rollups(self, user_id: str, period: str = "day",
+                start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+        """Per-day or per-week totals between start and end (inclusive)."""
+        with self._lock:
+            meals = self._user(user_id)
+            table = meals.weekly if period == "week" else meals.daily
+            items = sorted(table.items())
+
+        if period == "week" and start is not None:
+            start = start - timedelta(days=start.weekday())
+
+        out = []
+        for key, acc in items:
+            if (start and key < start) or (end and key > end):
+                continue
+            count = int(acc[-2])
+            row = {"period_start": key.isoformat(), "meals": count}
+            row.update({name: round(float(v), 1) for name, v in zip(SUMMED, acc[:len(SUMMED)])})
+            row["avg_health_score"] = round(float(acc[-1]) / count, 1) if count else 0
+            out.append(row)
+        return out
+
+    def history(self, user_id: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict:
+        """Meals in [start, end) with scores and missing nutrients computed in one batch."""
+        with self._lock:
+            meals = self._user(user_id)
+            lo, hi = meals.span(start, end)
+            cols = {k: v.copy() for k, v in meals.columns(lo, hi).items()}
+            ts = meals.ts[lo:hi].copy()
+            labels = meals.labels[lo:hi]
+
+        scores = compute_health_score_batch(cols)
+        missing = missing_nutrients_batch(cols)
+        names = [label for *_, label in MISSING_RULES]
+
+        return {
+            "meals": [
+                {
+                    "timestamp": datetime.fromtimestamp(float(t)).isoformat(timespec="seconds"),
+                    "detected_food": labels[i],
+                    "estimated_calories": None if np.isnan(cols["calories"][i]) else float(cols["calories"][i]),
+                    "health_score": int(scores[i]),
+                    "missing_nutrients": [n for n, m in zip(names, missing[i]) if m],
+                }
+                for i, t in enumerate(ts)
+            ],
+            "avg_health_score": round(float(scores.mean()), 1) if len(scores) else 0,
+        }
+
+
+meal_history = MealHistory()
@@ -1,11 +1,33 @@
 # multi_model_detection.py
 
+import os
+import cv2
+import numpy as np
 from ultralytics import YOLO
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from config import WESTERN_MODEL_PATH, INDIAN_MODEL_PATH
+from telemetry import span
+from singleflight import SingleFlight, make_key
+from admission import LIMITERS
 
 western_model = YOLO(WESTERN_MODEL_PATH)
 indian_model = YOLO(INDIAN_MODEL_PATH)
+MODELS = {"indian": indian_model, "western": western_model}
+
+# "auto" cascade: run one model, only run the other when the first result is weak.
+# CASCADE=0 restores the old behaviour (always both).
+CASCADE = os.getenv("CASCADE", "1") != "0"
+CASCADE_FIRST = os.getenv("CASCADE_FIRST", "indian").strip().lower()  # when the router is unsure
+CASCADE_MAX_CONF = float(os.getenv("CASCADE_MAX_CONF", "0.6"))        # best box must reach this
+CASCADE_MEAN_CONF = float(os.getenv("CASCADE_MEAN_CONF", "0.5"))      # and the average this
+ROUTER_PATH = os.getenv(
+    "CUISINE_ROUTER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cuisine_router.npz"),
+)
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.1"))   # min distance gap to trust the router
+
+if CASCADE_FIRST not in MODELS:
+    raise ValueError(f"CASCADE_FIRST must be one of {sorted(MODELS)}, got {CASCADE_FIRST!r}")
 
 
 def _clean_label(lbl: str) -> str:
@@ -34,13 +56,121 @@ def _run_model(model, image) -> List[Tuple[str, float, list]]:
     return detections
 
 
+# =========================
+# CUISINE ROUTER
+# =========================
+
+def route_features(image) -> np.ndarray:
+    """Cheap global descriptor: normalized 8x4x4 HSV colour histogram of a 64x64 thumbnail."""
+    small = cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, [8, 4, 4], [0, 180, 0, 256, 0, 256]).ravel()
+    return hist / (hist.sum() or 1.0)
+
+
+class CuisineRouter:
+    """Nearest-centroid classifier over route_features (fit by benchmarks/eval_cascade.py)."""
+
+    def __init__(self, centroids: np.ndarray, labels: List[str]):
+        self.centroids = centroids
+        self.labels = labels
+
+    @classmethod
+    def load(cls, path: str = ROUTER_PATH) -> Optional["CuisineRouter"]:
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(data["centroids"], [str(x) for x in data["labels"]])
+
+    def predict_features(self, features: np.ndarray) -> Tuple[str, float]:
+        """(cuisine, margin) — margin is the relative gap between the two nearest centroids."""
+        dist = np.linalg.norm(self.centroids - features, axis=1)
+        order = np.argsort(dist)
+        margin = float((dist[order[1]] - dist[order[0]]) / (dist[order[1]] or 1.0))
+        return self.labels[order[0]], margin
+
+    def predict(self, image) -> Tuple[str, float]:
+        return self.predict_features(route_features(image))
+
+
+cuisine_router = CuisineRouter.load()
+
+
+def needs_second(detections, max_conf: float = CASCADE_MAX_CONF,
+                 mean_conf: float = CASCADE_MEAN_CONF) -> Tuple[bool, str]:
+    """Decide from the first model's confidences whether the other model must run."""
+    if not detections:
+        return True, "no_detections"
+    confs = [conf for _, conf, _ in detections]
+    if max(confs) < max_conf:
+        return True, "low_max_conf"
+    if sum(confs) / len(confs) < mean_conf:
+        return True, "low_mean_conf"
+    return False, "confident"
+
+
+# Concurrent requests for the same image (double submits) share one detection
+_inflight = SingleFlight()
+
+
+def detect_with_route(image, model_type="auto"):
+    """
+    Like detect_best_conf, plus a dict describing the path taken, e.g.
+    {"path": "indian->western", "first": "indian", "router": "default", "reason": "low_max_conf"}.
+    """
+    key = make_key(model_type, image.shape, image.dtype, image.tobytes())
+    return _inflight.do(key, lambda: _detect(image, model_type))
+
+
 def detect_best_conf(image, model_type="auto"):
-    if model_type == "indian":
-        det = _run_model(indian_model, image)
-    elif model_type == "western":
-        det = _run_model(western_model, image)
-    else:
-        det = _run_model(indian_model, image) + _run_model(western_model, image)
+    labels, confs, boxes, _ = detect_with_route(image, model_type)
+    return labels, confs, boxes
+
+
+def pick_first(cuisine: str, margin: float) -> Tuple[str, str]:
+    """(model to run first, chosen_by) for a router prediction."""
+    if margin >= ROUTER_MARGIN and cuisine in MODELS:
+        return cuisine, "classifier"
+    return CASCADE_FIRST, "default"
+
+
+def _first_model(image) -> Tuple[str, str]:
+    if cuisine_router is not None:
+        with span("cuisine_router"):
+            return pick_first(*cuisine_router.predict(image))
+    return CASCADE_FIRST, "default"
+
+
+def _detect(image, model_type):
+    det = []
+    with LIMITERS["detector"].slot():
+        if model_type in ("indian", "western"):
+            with span(f"yolo_{model_type}"):
+                det += _run_model(MODELS[model_type], image)
+            route = {"path": f"{model_type}_only", "reason": "requested"}
+
+        elif not CASCADE:
+            for name, model in MODELS.items():
+                with span(f"yolo_{name}"):
+                    det += _run_model(model, image)
+            route = {"path": "indian+western", "reason": "cascade_off"}
+
+        else:
+            first, chosen_by = _first_model(image)
+            second = "western" if first == "indian" else "indian"
+            with span(f"yolo_{first}"):
+                det += _run_model(MODELS[first], image)
+
+            escalate, reason = needs_second(det)
+            if escalate:
+                with span(f"yolo_{second}"):
+                    det += _run_model(MODELS[second], image)
+            route = {
+                "path": f"{first}->{second}" if escalate else f"{first}_only",
+                "first": first,
+                "router": chosen_by,
+                "reason": reason,
+            }
 
     best = {}
     for label, conf, bbox in det:
@@ -50,4 +180,4 @@ def detect_best_conf(image, model_type="auto"):
     labels = list(best.keys())
     confs = {lbl: v[0] for lbl, v in best.items()}
     boxes = {lbl: v[1] for lbl, v in best.items()}
-    return labels, confs, boxes
+    return labels, confs, boxes, route
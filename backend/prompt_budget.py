@@ -0,0 +1,63 @@
+# prompt_budget.py
+#
+# Token budgeting for the LLM prompts: a cheap token estimator (no tokenizer
+# dependency) and the output caps we request per response schema.
+
+import re
+import json
+
+# Upper bound of completion tokens per schema. The answers are small JSON
+# objects; asking for LLM_MAX_TOKENS on every call only adds latency risk.
+OUTPUT_TOKENS = {
+    "nutrition": 320,
+    "diet": 200,
+    "recipe": 900,
+    "adjust": 900,
+    "replacement": 220,
+    "shelf_life": 80,
+}
+
+# Input budgets the prompt builders are expected to stay under
+# (checked by tests/test_prompt_budget.py and benchmarks/prompt_sizes.py).
+PROMPT_TOKEN_BUDGET = {
+    "nutrition": 300,
+    "diet": 300,
+    "recipe": 180,
+    "adjust": 560,
+    "replacement": 210,
+}
+
+_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count: words cost one token per ~5 letters, numbers one per
+    ~3 digits, every punctuation mark one. Close enough to Llama/GPT
+    tokenizers on English + JSON to track prompt size regressions.
+    """
+    total = 0
+    for piece in _PIECES.findall(text):
+        if piece[0].isalpha():
+            total += 1 + (len(piece) - 1) // 5
+        elif piece[0].isdigit():
+            total += 1 + (len(piece) - 1) // 3
+        else:
+            total += 1
+    return total
+
+
+def compact_json(data) -> str:
+    """JSON without whitespace; the model does not need it pretty-printed."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def round_numbers(data, digits: int = 1):
+    """Round floats recursively so 12.345678 does not cost five extra tokens."""
+    if isinstance(data, float):
+        return round(data, digits)
+    if isinstance(data, dict):
+        return {k: round_numbers(v, digits) for k, v in data.items()}
+    if isinstance(data, list):
+        return [round_numbers(v, digits) for v in data]
+    return data
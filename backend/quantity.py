@@ -0,0 +1,158 @@
+# backend/quantity.py
+#
+# Parse, convert and scale free-text ingredient quantities ("200 g",
+# "1 1/2 cups", "2 tbsp", "½ tsp", "1-2 cloves") without calling the LLM.
+
+import re
+from fractions import Fraction
+from typing import NamedTuple, Optional
+
+# unit alias -> (canonical unit, dimension, size in base unit: g or ml)
+UNITS = {
+    "mg": ("mg", "mass", 0.001),
+    "g": ("g", "mass", 1.0), "gm": ("g", "mass", 1.0), "gms": ("g", "mass", 1.0),
+    "gram": ("g", "mass", 1.0), "grams": ("g", "mass", 1.0), "gr": ("g", "mass", 1.0),
+    "kg": ("kg", "mass", 1000.0), "kgs": ("kg", "mass", 1000.0),
+    "kilogram": ("kg", "mass", 1000.0), "kilograms": ("kg", "mass", 1000.0),
+    "oz": ("oz", "mass", 28.3495), "ounce": ("oz", "mass", 28.3495), "ounces": ("oz", "mass", 28.3495),
+    "lb": ("lb", "mass", 453.592), "lbs": ("lb", "mass", 453.592),
+    "pound": ("lb", "mass", 453.592), "pounds": ("lb", "mass", 453.592),
+    "ml": ("ml", "volume", 1.0), "milliliter": ("ml", "volume", 1.0), "millilitre": ("ml", "volume", 1.0),
+    "milliliters": ("ml", "volume", 1.0), "millilitres": ("ml", "volume", 1.0),
+    "l": ("l", "volume", 1000.0), "liter": ("l", "volume", 1000.0), "litre": ("l", "volume", 1000.0),
+    "liters": ("l", "volume", 1000.0), "litres": ("l", "volume", 1000.0),
+    "tsp": ("tsp", "volume", 5.0), "teaspoon": ("tsp", "volume", 5.0), "teaspoons": ("tsp", "volume", 5.0),
+    "tbsp": ("tbsp", "volume", 15.0), "tablespoon": ("tbsp", "volume", 15.0),
+    "tablespoons": ("tbsp", "volume", 15.0), "tbs": ("tbsp", "volume", 15.0),
+    "cup": ("cup", "volume", 240.0), "cups": ("cup", "volume", 240.0),
+    "fl oz": ("fl oz", "volume", 29.5735),
+}
+
+# Units that read better as kitchen fractions than decimals
+_FRACTION_UNITS = {"tsp", "tbsp", "cup", "count"}
+
+_UNICODE_FRACTIONS = {
+    "½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4",
+    "⅕": "1/5", "⅛": "1/8", "⅜": "3/8", "⅝": "5/8", "⅞": "7/8",
+}
+
+# Trailing text that means the amount is not a measure ("2 to taste")
+_UNSCALABLE = ("to taste", "as needed", "as required", "for garnish")
+
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)"
+_QTY_RE = re.compile(
+    rf"^\s*(?P<num>{_NUMBER})(?:\s*(?:-|–|to)\s*(?P<max>{_NUMBER}))?\s*(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+
+
+class Quantity(NamedTuple):
+    amount: float
+    unit: str               # canonical unit ("g", "cup", ...) or "count"
+    rest: str = ""          # trailing text: "cloves", "chopped", ...
+    amount_max: Optional[float] = None   # upper bound for ranges like "1-2"
+
+    @property
+    def dimension(self) -> str:
+        return UNITS[self.unit][1] if self.unit in UNITS else "count"
+
+
+def _to_float(num: str) -> float:
+    parts = num.split()
+    return float(sum(Fraction(p) for p in parts))
+
+
+def parse_qty(text: str) -> Optional[Quantity]:
+    """Returns None for quantities we cannot scale ("to taste", "a pinch")."""
+    if not text:
+        return None
+    for uni, frac in _UNICODE_FRACTIONS.items():
+        # "1½" -> "1 1/2"
+        text = re.sub(rf"(\d){uni}", rf"\1 {frac}", text).replace(uni, frac)
+
+    m = _QTY_RE.match(text)
+    if not m:
+        return None
+
+    try:
+        amount = _to_float(m.group("num"))
+        amount_max = _to_float(m.group("max")) if m.group("max") else None
+    except ZeroDivisionError:   # "1/0 cup"
+        return None
+    rest = m.group("rest").strip()
+    if rest.lower().startswith(_UNSCALABLE):
+        return None
+
+    words = rest.split()
+    for n in (2, 1):
+        key = " ".join(words[:n]).lower().rstrip(".")
+        if len(words) >= n and key in UNITS:
+            return Quantity(amount, UNITS[key][0], " ".join(words[n:]), amount_max)
+    return Quantity(amount, "count", rest, amount_max)
+
+
+def convert(q: Quantity, unit: str) -> Optional[Quantity]:
+    """Convert between units of the same dimension; None if incompatible."""
+    if q.unit == unit:
+        return q
+    if q.unit not in UNITS or unit not in UNITS or UNITS[q.unit][1] != UNITS[unit][1]:
+        return None
+    ratio = UNITS[q.unit][2] / UNITS[unit][2]
+    amount_max = q.amount_max * ratio if q.amount_max is not None else None
+    return Quantity(q.amount * ratio, unit, q.rest, amount_max)
+
+
+def _tidy_unit(q: Quantity) -> Quantity:
+    """Move to a friendlier unit after scaling (1500 g -> 1.5 kg, 6 tsp -> 2 tbsp)."""
+    upgrades = {"g": ("kg", 1000), "ml": ("l", 1000), "tsp": ("tbsp", 6), "tbsp": ("cup", 16)}
+    downgrades = {"kg": ("g", 1), "l": ("ml", 1), "cup": ("tbsp", 0.25), "tbsp": ("tsp", 1)}
+    if q.unit in upgrades and q.amount >= upgrades[q.unit][1]:
+        return convert(q, upgrades[q.unit][0])
+    if q.unit in downgrades and q.amount < downgrades[q.unit][1]:
+        return convert(q, downgrades[q.unit][0])
+    return q
+
+
+def _fmt_number(x: float, unit: str) -> str:
+    if unit in _FRACTION_UNITS:
+        frac = Fraction(x).limit_denominator(4)
+        if abs(float(frac) - x) > 0.1 * max(x, 0.1):
+            frac = Fraction(x).limit_denominator(8)
+        whole, part = divmod(frac, 1)
+        if part == 0:
+            return str(int(whole))
+        return f"{int(whole)} {part}" if whole else str(part)
+    if unit in ("g", "ml") and x >= 10:
+        return str(int(round(x)))
+    return f"{x:.2f}".rstrip("0").rstrip(".")
+
+
+def format_qty(q: Quantity) -> str:
+    num = _fmt_number(q.amount, q.unit)
+    if q.amount_max is not None:
+        num = f"{num}-{_fmt_number(q.amount_max, q.unit)}"
+    unit = "cups" if q.unit == "cup" and q.amount > 1 else q.unit
+    parts = [num] if q.unit == "count" else [num, unit]
+    if q.rest:
+        parts.append(q.rest)
+    return " ".join(parts)
+
+
+def scale_qty(text: str, factor: float) -> str:
+    """Scale a quantity string; unparseable text is returned unchanged."""
+    q = parse_qty(text)
+    if q is None or factor == 1:
+        return text
+    amount_max = q.amount_max * factor if q.amount_max is not None else None
+    return format_qty(_tidy_unit(Quantity(q.amount * factor, q.unit, q.rest, amount_max)))
+
+
+def add_qty(a: str, b: str) -> Optional[str]:
+    """Sum two quantity strings of the same dimension ("200 g" + "0.5 kg"), else None."""
+    qa, qb = parse_qty(a), parse_qty(b)
+    if qa is None or qb is None or qa.amount_max is not None or qb.amount_max is not None:
+        return None
+    qb = convert(qb, qa.unit) if qa.unit != "count" else (qb if qb.unit == "count" else None)
+    if qb is None:
+        return None
+    return format_qty(_tidy_unit(Quantity(qa.amount + qb.amount, qa.unit, qa.rest)))
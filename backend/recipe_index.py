@@ -0,0 +1,145 @@
+# backend/recipe_index.py
+#
+# Local recipe corpus + inverted index for "what can I cook now".
+# Ranking is pure NumPy; the LLM is only used later to expand the winners.
+
+import os
+import json
+from typing import List, Dict, Optional
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+RECIPES_PATH = os.path.join(DATA_DIR, "recipes.json")
+
+# Assumed to be in every kitchen -> never count as missing
+STAPLES = {"salt", "oil", "water", "spices", "sugar"}
+
+# How much an item about to expire outweighs one that keeps for weeks
+URGENCY_BOOST = 2.0
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().replace("_", " ").replace("-", " ").split())
+
+
+class RecipeIndex:
+    """
+    Recipes x ingredients incidence matrix in CSR form (indptr/indices) plus an
+    ingredient -> recipes inverted index stored as Python int bitsets.
+    """
+
+    def __init__(self, recipes: List[Dict]):
+        self.recipes = recipes
+        self.vocab: Dict[str, int] = {}
+        self.postings: List[int] = []   # vocab id -> bitset of recipe ids
+
+        indptr, indices = [0], []
+        for rid, recipe in enumerate(recipes):
+            ids = set()
+            for ing in recipe["ingredients"]:
+                name = _normalize(ing)
+                if name in STAPLES:
+                    continue
+                if name not in self.vocab:
+                    self.vocab[name] = len(self.vocab)
+                    self.postings.append(0)
+                vid = self.vocab[name]
+                ids.add(vid)
+                self.postings[vid] |= 1 << rid
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.sizes = np.diff(self.indptr).astype(np.float32)
+        # recipe id of every CSR entry; rows can be empty (all-STAPLES recipes)
+        self.row_of = np.repeat(np.arange(len(recipes), dtype=np.int64), np.diff(self.indptr))
+        self.names = sorted(self.vocab, key=self.vocab.get)
+
+    # ---------- name matching ----------
+
+    def canonical(self, name: str) -> Optional[str]:
+        """Map an inventory name ("Chicken Breast", "Tomatoes") onto the vocabulary."""
+        name = _normalize(name)
+        tokens = name.split()
+        for size in range(min(3, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size, -1, -1):
+                phrase = " ".join(tokens[start:start + size])
+                for cand in (phrase, phrase[:-1] if phrase.endswith("s") else None,
+                             phrase[:-2] if phrase.endswith("es") else None):
+                    if cand and cand in self.vocab:
+                        return cand
+        return None
+
+    # ---------- ranking ----------
+
+    def _weights(self, items: List[Dict]) -> np.ndarray:
+        """Per-ingredient weight: 0 if not in stock, >1 the closer it is to expiry."""
+        w = np.zeros(len(self.vocab), dtype=np.float32)
+        for item in items:
+            name = self.canonical(item.get("name", ""))
+            if name is None:
+                continue
+            days = item.get("daysLeft")
+            urgency = 0.0 if days is None else URGENCY_BOOST / (1.0 + max(days, 0))
+            vid = self.vocab[name]
+            w[vid] = max(w[vid], 1.0 + urgency)
+        return w
+
+    def rank(self, items: List[Dict], top_k: int = 5, exclude=None) -> List[Dict]:
+        """
+        Score every recipe that uses at least one stocked ingredient.
+        `exclude(recipe)` can veto recipes (e.g. dietary restrictions).
+        """
+        w = self._weights(items)
+        stocked = np.flatnonzero(w)
+        if len(stocked) == 0 or len(self.recipes) == 0:
+            return []
+
+        # Candidate recipes = OR of the posting bitsets of stocked ingredients
+        bits = 0
+        for vid in stocked:
+            bits |= self.postings[vid]
+
+        # Sparse mat-vec over the CSR rows: sum of weights / recipe size
+        n = len(self.recipes)
+        entry_w = w[self.indices]
+        weighted = np.bincount(self.row_of, weights=entry_w, minlength=n)
+        matched = np.bincount(self.row_of, weights=(entry_w > 0).astype(np.float32), minlength=n)
+        sizes = np.maximum(self.sizes, 1.0)
+        score = weighted / sizes
+        coverage = matched / sizes
+
+        results = []
+        for rid in np.argsort(-score, kind="stable"):
+            if len(results) >= top_k:
+                break
+            rid = int(rid)
+            if not (bits >> rid) & 1:
+                continue
+            recipe = self.recipes[rid]
+            if exclude is not None and exclude(recipe):
+                continue
+
+            row = self.indices[self.indptr[rid]:self.indptr[rid + 1]]
+            results.append({
+                "title": recipe["title"],
+                "cuisine": recipe.get("cuisine", ""),
+                "ingredients": recipe["ingredients"],
+                "score": round(float(score[rid]), 3),
+                "coverage": round(float(coverage[rid]), 3),
+                "uses": [self.names[v] for v in row if w[v] > 0],
+                "missing": [self.names[v] for v in row if w[v] == 0],
+                "uses_expiring": [self.names[v] for v in row if w[v] > 1.5],
+            })
+        return results
+
+
+def load_index(path: str = RECIPES_PATH) -> RecipeIndex:
+    with open(path, encoding="utf-8") as f:
+        return RecipeIndex(json.load(f))
+
+
+# Built once at import
+recipe_index = load_index()
@@ -1,6 +1,6 @@
 # backend/recipe_models.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 
 
@@ -20,8 +20,9 @@ class Recipe(BaseModel):
 
 class RecipeGenerateRequest(BaseModel):
     dish: str
-    servings: int = 2
+    servings: int = Field(2, ge=1)
     preferences: List[str] = []  # ["vegan", "high protein", "gluten free"] etc.
+    regenerate: bool = False     # skip stored recipes and ask the LLM for a new one
 
 
 class RecipeUpdateRequest(BaseModel):
@@ -29,6 +30,8 @@ class RecipeUpdateRequest(BaseModel):
     excluded_items: List[str] = []       # ingredient names to remove
     added_items: List[Ingredient] = []   # new ingredients user wants to add
     preferences: List[str] = []
+    servings: Optional[int] = Field(None, ge=1)   # rescale quantities to this many servings
+    rewrite_steps: bool = False          # ask the LLM to rewrite steps (slow)
 
 
 class RecipeReplaceRequest(BaseModel):
@@ -40,3 +43,16 @@ class RecipeReplaceRequest(BaseModel):
 class RecipeSaveRequest(BaseModel):
     recipe: Recipe
     user_id: Optional[str] = None
+
+
+class PantryItem(BaseModel):
+    name: str
+    daysLeft: Optional[int] = None   # same field as the inventory API
+
+
+class RecipeSuggestRequest(BaseModel):
+    items: List[PantryItem]
+    preferences: List[str] = []
+    top_k: int = Field(5, ge=1, le=50)
+    expand: int = Field(0, ge=0, le=3)   # how many of the top results to turn into full recipes via the LLM
+    servings: int = Field(2, ge=1)
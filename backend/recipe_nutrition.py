@@ -0,0 +1,50 @@
+# recipe_nutrition.py
+#
+# Background nutrition enrichment for recipes. Recipe routes return the recipe
+# right away with "nutrition_job" set; the analyze_nutrition LLM call runs on
+# the job queue and the client fetches it from /api/jobs/{id} (or its SSE
+# stream). Importing this module registers the handler, which also resumes
+# jobs left pending by a previous run.
+
+from typing import Dict, List
+
+from analysis_pipeline import analyze_nutrition
+from jobs import job_queue
+
+JOB_KIND = "recipe_nutrition"
+
+
+def compute_recipe_nutrition(recipe: Dict, conditions: List[str]) -> Dict:
+    """recipe["ingredients"] is a list of {name, qty}."""
+    ingredients = recipe.get("ingredients", [])
+    labels = [i["name"] for i in ingredients]
+    portions = [i.get("qty", "") for i in ingredients]
+    if not labels:
+        return {}
+    return analyze_nutrition(labels, portions, conditions) or {}
+
+
+def _nutrition_job(payload: Dict) -> Dict:
+    return compute_recipe_nutrition({"ingredients": payload["ingredients"]}, payload["conditions"])
+
+
+job_queue.register(JOB_KIND, _nutrition_job)
+
+
+def enqueue_nutrition(recipe: Dict, conditions: List[str]) -> Dict:
+    """
+    Set recipe["nutrition_job"] to the id of a queued nutrition job (None if
+    the recipe has no ingredients or already carries nutrition, e.g. a saved
+    recipe). Identical ingredient lists share one job.
+    """
+    ingredients = sorted(
+        ({"name": i["name"], "qty": i.get("qty", "")} for i in recipe.get("ingredients", [])),
+        key=lambda i: (i["name"].lower(), i["qty"]),
+    )
+    recipe["nutrition"] = recipe.get("nutrition") or {}
+    recipe["nutrition_job"] = None
+    if ingredients and not recipe["nutrition"]:
+        recipe["nutrition_job"] = job_queue.submit(
+            JOB_KIND, {"ingredients": ingredients, "conditions": sorted(conditions)}
+        )
+    return recipe
@@ -1,7 +1,18 @@
 # backend/recipe_pipeline.py
 
-from typing import List, Dict
+import re
+import contextvars
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 from llm_client import call_llm
+from recipe_index import recipe_index
+from substitutions import substitution_graph
+from recipe_store import recipe_store
+from recipe_nutrition import enqueue_nutrition
+from dietary_rules import compile_rules
+from quantity import scale_qty, add_qty
+from telemetry import span
+from prompt_budget import OUTPUT_TOKENS
 from recipe_prompt import (
     build_recipe_prompt,
     build_adjust_recipe_prompt,
@@ -9,49 +20,26 @@ from recipe_prompt import (
 )
 
 
-# Filter unsafe ingredients based on preferences
+# Filter unsafe ingredients based on preferences (rules live in data/dietary_rules.json)
 def filter_restricted_ingredients(preferences: List[str], ingredients: List[Dict]) -> List[Dict]:
-    restricted = []
-
-    # Halal rules: exclude pork, alcohol, gelatin
-    if "halal" in preferences:
-        restricted.extend([
-            "pork", "bacon", "gelatin", "beer", "wine", "rum",
-            "ham", "lard", "sausage", "pepperoni"
-        ])
-
-    # Vegetarian: exclude all meat and fish
-    if "vegetarian" in preferences:
-        restricted.extend(["chicken", "beef", "fish", "lamb", "shrimp", "egg"])
-
-    # Vegan: exclude all as above + dairy + honey
-    if "vegan" in preferences:
-        restricted.extend(["milk", "cheese", "butter", "yogurt", "cream", "egg", "honey"])
-
-    # Custom preference exclusions
-    restriction_map = {
-        "chicken": ["beef", "fish", "lamb", "pork"],
-        "beef": ["chicken", "fish", "lamb", "pork"],
-        "fish": ["chicken", "beef", "lamb", "pork"],
-        "lamb": ["chicken", "beef", "fish", "pork"],
-    }
-
-    for pref in preferences:
-        restricted.extend(restriction_map.get(pref, []))
+    matcher = compile_rules(preferences)
+    if not matcher:
+        return ingredients
+    return [i for i in ingredients if matcher.violation(i["name"]) is None]
 
-    restricted = [r.lower() for r in restricted]
-
-    # Filter restricted ingredients
-    return [
-        i for i in ingredients
-        if i["name"].lower() not in restricted
-    ]
 
-
-def generate_recipe(dish: str, servings: int, preferences: List[str]) -> Dict:
+def generate_recipe(dish: str, servings: int, preferences: List[str], regenerate: bool = False) -> Dict:
     print("GEN REQ:", dish, servings, preferences)
 
-    response = call_llm(build_recipe_prompt(dish, servings, preferences))
+    # A saved (or previously generated) recipe for the same dish is an instant read
+    if not regenerate:
+        with span("recipe_store_lookup"):
+            stored = recipe_store.find(dish, servings, preferences)
+        if stored:
+            return enqueue_nutrition(stored, preferences)
+
+    prompt = build_recipe_prompt(dish, servings, preferences)
+    response = call_llm(prompt, OUTPUT_TOKENS["recipe"], prompt_type="recipe")
 
     # If valid dict → use it
     if isinstance(response, dict) and "ingredients" in response:
@@ -59,7 +47,14 @@ def generate_recipe(dish: str, servings: int, preferences: List[str]) -> Dict:
             preferences, response.get("ingredients", [])
         )
         response["nutrition"] = {}
-        return response
+        try:
+            response["id"] = recipe_store.save(
+                response, source="generated", dish=dish, preferences=preferences
+            )["id"]
+        except Exception as e:
+            print("RECIPE STORE ERROR:", e)
+        # nutrition is computed in the background (see /api/jobs/{id})
+        return enqueue_nutrition(response, preferences)
 
     # ⚠️ Fallback: LLM returned empty OR invalid JSON
     print("⚠️ LLM FAILED — returning fallback recipe")
@@ -76,36 +71,115 @@ def generate_recipe(dish: str, servings: int, preferences: List[str]) -> Dict:
 
 
 
-def adjust_recipe(recipe: Dict, excluded_items: List[str], added_items: List[Dict], preferences: List[str]):
-    # Remove excluded ingredients
-    updated_ingredients = [
-        i for i in recipe["ingredients"] if i["name"] not in excluded_items
-    ] + added_items
+def _mention_pattern(names) -> Optional["re.Pattern"]:
+    """Whole-word (optionally plural) match for any of `names`: "oil" hits "Heat oil", not "Boil"."""
+    names = sorted((n for n in names if n), key=len, reverse=True)
+    if not names:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(n) for n in names) + r")(?:e?s)?\b", re.IGNORECASE)
+
+
+def adjust_recipe(
+    recipe: Dict,
+    excluded_items: List[str],
+    added_items: List[Dict],
+    preferences: List[str],
+    servings: Optional[int] = None,
+) -> Dict:
+    """
+    Deterministic recipe edit: remove / add ingredients and rescale quantities
+    locally. Steps are kept as they are; the indexes of steps that still
+    mention a removed item are returned in "steps_to_review", and each newly
+    added item gets a plain "Add <qty> <name>." step before the last one.
+    Use rewrite_recipe_steps() to have the LLM rewrite the steps properly.
+    Nutrition is recomputed in the background ("nutrition_job").
+    """
+    excluded = {e.lower().strip() for e in excluded_items}
+
+    updated_ingredients = []
+    for ing in recipe["ingredients"]:
+        if ing["name"].lower().strip() not in excluded:
+            updated_ingredients.append(dict(ing))
+
+    # Adding an ingredient that is already there merges the quantities;
+    # units that cannot be summed ("1 tsp" + "a pinch") are joined with " + "
+    new_items = []
+    for new in added_items:
+        current = next(
+            (i for i in updated_ingredients if i["name"].lower().strip() == new["name"].lower().strip()),
+            None,
+        )
+        if current is None:
+            new_items.append(dict(new))
+            updated_ingredients.append(new_items[-1])
+            continue
+        qty = new.get("qty", "")
+        merged = add_qty(current.get("qty", ""), qty)
+        current["qty"] = merged or " + ".join(q for q in (current.get("qty", ""), qty) if q)
 
     updated_ingredients = filter_restricted_ingredients(preferences, updated_ingredients)
 
-    cleaned_recipe = recipe.copy()
-    cleaned_recipe["ingredients"] = updated_ingredients
-
-    # LLM rewrite of steps
-    prompt = build_adjust_recipe_prompt(cleaned_recipe, excluded_items, added_items, preferences)
-    llm_output = call_llm(prompt)
-
-    if isinstance(llm_output, dict):
-        llm_output["nutrition"] = {}
-        return llm_output
-
-    # fallback step rewrite
-    cleaned_recipe["steps"] = [
-        step for step in recipe["steps"]
-        if not any(item.lower() in step.lower() for item in excluded_items)
+    old_servings = recipe.get("servings") or 0
+    if servings and old_servings and servings != old_servings:
+        factor = servings / old_servings
+        for ing in updated_ingredients:
+            parts = ing.get("qty", "").split(" + ")
+            ing["qty"] = " + ".join(scale_qty(part, factor) for part in parts)
+
+    updated = dict(recipe)
+    updated["ingredients"] = updated_ingredients
+    updated["servings"] = servings or old_servings
+    steps = list(recipe["steps"])
+    added_steps = [
+        f"Add {ing['qty']} {ing['name']}." if ing.get("qty") else f"Add {ing['name']}."
+        for ing in updated_ingredients
+        if any(ing is added for added in new_items)
     ]
-    cleaned_recipe["nutrition"] = {}
-    print("LLM FAILED — fallback step rewrite")
-    return cleaned_recipe
+    at = max(len(steps) - 1, 0)
+    updated["steps"] = steps[:at] + added_steps + steps[at:]
 
+    pattern = _mention_pattern(excluded)
+    updated["steps_to_review"] = [
+        i for i, step in enumerate(updated["steps"]) if pattern and pattern.search(step)
+    ]
+    updated["nutrition"] = {}   # ingredients changed: the old figures no longer apply
+    return enqueue_nutrition(updated, preferences)
+
+
+def rewrite_recipe_steps(
+    updated: Dict,
+    excluded_items: List[str],
+    added_items: List[Dict],
+    preferences: List[str],
+) -> Dict:
+    """
+    Optional LLM pass that only rewrites the steps of an already-adjusted
+    recipe. The prompt is built from the adjusted recipe, so the steps match
+    its servings and scaled amounts; ingredients stay as computed locally.
+    """
+    prompt = build_adjust_recipe_prompt(updated, excluded_items, added_items, preferences)
+    llm_output = call_llm(prompt, OUTPUT_TOKENS["adjust"], prompt_type="adjust")
+
+    if isinstance(llm_output, dict) and isinstance(llm_output.get("steps"), list):
+        updated = dict(updated)
+        updated["steps"] = llm_output["steps"]
+        updated["steps_to_review"] = []
+        return updated
+
+    print("LLM FAILED — keeping locally adjusted steps")
+    return updated
+
+
+def suggest_replacement(ingredient_name: str, recipe: Dict, preferences: List[str], removed_items: Optional[List[str]] = None):
+    # Local substitution graph first; skip what is already in the recipe
+    in_recipe = [i.get("name", "") for i in recipe.get("ingredients", [])]
+    with span("substitution_lookup"):
+        local = substitution_graph.query(
+            ingredient_name, preferences, exclude=in_recipe + (removed_items or [])
+        )
+    if local:
+        return {"ingredient": ingredient_name, "replacements": local, "source": "local"}
 
-def suggest_replacement(ingredient_name: str, recipe: Dict, preferences: List[str], removed_items: List[str]):
     prompt = build_replacement_prompt(
         ingredient_name=ingredient_name,
         recipe=recipe,
@@ -113,7 +187,7 @@ def suggest_replacement(ingredient_name: str, recipe: Dict, preferences: List[st
         removed_items=removed_items,
     )
 
-    replacements = call_llm(prompt)
+    replacements = call_llm(prompt, OUTPUT_TOKENS["replacement"], prompt_type="replacement")
 
     if not isinstance(replacements, dict):
         return {
@@ -121,4 +195,38 @@ def suggest_replacement(ingredient_name: str, recipe: Dict, preferences: List[st
             "replacements": [{"name": "None", "reason": "No valid alternatives"}]
         }
 
+    substitution_graph.learn(ingredient_name, replacements.get("replacements") or [])
     return replacements
+
+
+def suggest_from_inventory(
+    items: List[Dict],
+    preferences: List[str],
+    top_k: int = 5,
+    expand: int = 0,
+    servings: int = 2,
+) -> Dict:
+    """
+    Rank the local recipe corpus against what is in stock (no LLM), then
+    optionally expand the first `expand` hits into full recipes.
+    """
+    def violates(recipe):
+        ings = [{"name": n} for n in recipe["ingredients"]]
+        return len(filter_restricted_ingredients(preferences, ings)) < len(ings)
+
+    with span("rank"):
+        suggestions = recipe_index.rank(items, top_k=top_k, exclude=violates)
+
+    expand = min(expand, len(suggestions))
+    if expand > 0:
+        with ThreadPoolExecutor(max_workers=expand) as pool:
+            # each expansion runs in a copy of the request context, so it keeps
+            # the request deadline (admission control) and its spans
+            futures = [
+                pool.submit(contextvars.copy_context().run, generate_recipe, s["title"], servings, preferences)
+                for s in suggestions[:expand]
+            ]
+            for s, future in zip(suggestions, futures):
+                s["recipe"] = future.result()
+
+    return {"suggestions": suggestions}
@@ -1,39 +1,32 @@
 # backend/recipe_prompt.py
 
-import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
+from prompt_budget import compact_json
 
-def build_recipe_prompt(dish: str, servings: int, preferences: List[str]) -> str:
-    prefs = ", ".join(preferences) if preferences else "none"
+RECIPE_SCHEMA = '{"title":"string","servings":<int>,"ingredients":[{"name":"string","qty":"string"}],"steps":["string"]}'
 
-    return f"""
-You are a professional chef and nutrition-aware recipe developer.
 
-TASK:
-Create a recipe for the dish "{dish}" for exactly {servings} servings.
-User preferences / constraints: {prefs}.
+def _compact_recipe(recipe: Dict) -> Dict:
+    """Only what the model needs to edit a recipe: no nutrition / calories."""
+    return {
+        "title": recipe.get("title", ""),
+        "servings": recipe.get("servings"),
+        "ingredients": [
+            {"name": i.get("name", ""), "qty": i.get("qty", "")} for i in recipe.get("ingredients", [])
+        ],
+        "steps": recipe.get("steps", []),
+    }
 
-RECIPE RULES:
-- Use common, clear ingredients (no brand names).
-- Use quantities in grams, ml, tsp, tbsp, cups etc.
-- Make the steps clear and ordered.
-- Respect dietary preferences (e.g., vegan: no animal products, etc).
 
-OUTPUT:
-Return ONLY a single valid JSON object with this exact schema and nothing else:
+def build_recipe_prompt(dish: str, servings: int, preferences: List[str]) -> str:
+    prefs = ", ".join(preferences) if preferences else "none"
 
-{{
-  "title": "string",
-  "servings": {servings},
-  "ingredients": [
-    {{"name": "string", "qty": "string"}}
-  ],
-  "steps": [
-    "string"
-  ]
-}}
-"""
+    return f"""You are a professional chef. Create a recipe for "{dish}" for exactly {servings} servings.
+Preferences/constraints: {prefs}.
+Rules: common ingredients, no brands; quantities in g, ml, tsp, tbsp, cups; clear ordered steps; respect dietary preferences (e.g. vegan: no animal products).
+Return ONLY one JSON object:
+{RECIPE_SCHEMA.replace("<int>", str(servings))}"""
 
 
 def build_adjust_recipe_prompt(
@@ -43,81 +36,36 @@ def build_adjust_recipe_prompt(
     preferences: List[str]
 ) -> str:
     prefs = ", ".join(preferences) if preferences else "none"
+    added = [{"name": i.get("name", ""), "qty": i.get("qty", "")} for i in added_items]
 
-    return f"""
-You are a professional chef. You will MODIFY an existing recipe.
-
-ORIGINAL_RECIPE (JSON):
-{json.dumps(original_recipe, ensure_ascii=False)}
-
-INGREDIENTS TO REMOVE (by name):
-{json.dumps(excluded_items, ensure_ascii=False)}
-
-INGREDIENTS TO ADD (full JSON objects with name and qty):
-{json.dumps(added_items, ensure_ascii=False)}
-
-USER PREFERENCES / CONSTRAINTS:
-{prefs}
-
-TASK:
-- Remove all excluded ingredients from the recipe.
-- Add all added ingredients in a sensible way.
-- Update the steps so that they stay consistent with the new ingredient list.
-- Keep the same cuisine vibe and make it still taste good.
-- Ensure any dietary preferences are respected.
-
-OUTPUT:
-Return ONLY a single valid JSON object with the SAME SCHEMA as the original recipe:
-
-{{
-  "title": "string",
-  "servings": <int>,
-  "ingredients": [
-    {{"name": "string", "qty": "string"}}
-  ],
-  "steps": [
-    "string"
-  ]
-}}
-"""
+    return f"""You are a professional chef. MODIFY an existing recipe.
+Recipe: {compact_json(_compact_recipe(original_recipe))}
+Remove: {compact_json(excluded_items)}
+Add: {compact_json(added)}
+Preferences/constraints: {prefs}
+Remove the excluded ingredients, add the new ones sensibly, keep steps consistent with the ingredient list, keep the cuisine and taste, respect the preferences.
+Return ONLY one JSON object with the same schema:
+{RECIPE_SCHEMA}"""
 
 
 def build_replacement_prompt(
     ingredient_name: str,
     recipe: Dict,
-    preferences: List[str]
+    preferences: List[str],
+    removed_items: Optional[List[str]] = None,
 ) -> str:
     prefs = ", ".join(preferences) if preferences else "none"
-
-    return f"""
-You are a chef and nutrition expert.
-
-The user wants to REPLACE one ingredient in a recipe.
-
-INGREDIENT TO REPLACE:
-"{ingredient_name}"
-
-RECIPE (JSON):
-{json.dumps(recipe, ensure_ascii=False)}
-
-USER PREFERENCES:
-{prefs}
-
-TASK:
-Suggest 1-3 good replacements for this ingredient that:
-- Keep the dish as close as possible in taste/texture.
-- Respect dietary preferences (e.g., vegan, gluten-free, low-calorie, etc).
-
-OUTPUT:
-Return ONLY valid JSON with this schema:
-
-{{
-  "ingredient": "{ingredient_name}",
-  "replacements": [
-    {{
-      "name": "string",
-      "reason": "short explanation why this is a good replacement"
-    }}
-  ]
-}}
-"""
+    # The dish name and the other ingredients are enough context for a substitute
+    context = {
+        "dish": recipe.get("title", ""),
+        "ingredients": [i.get("name", "") for i in recipe.get("ingredients", [])],
+    }
+    avoid = f"\nDo not suggest: {compact_json(removed_items)}" if removed_items else ""
+
+    return f"""You are a chef and nutrition expert. The user wants to REPLACE one ingredient in a recipe.
+Ingredient: "{ingredient_name}"
+Recipe: {compact_json(context)}
+Preferences: {prefs}{avoid}
+Suggest 1-3 replacements that keep taste/texture close and respect the preferences.
+Return ONLY JSON:
+{{"ingredient":"{ingredient_name}","replacements":[{{"name":"string","reason":"short reason"}}]}}"""
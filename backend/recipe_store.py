@@ -0,0 +1,221 @@
+# backend/recipe_store.py
+#
+# Saved recipes in SQLite (data/recipes.db):
+#   - recipes are keyed by a hash of their content, so saving the same recipe
+#     twice (or from two users) stores it once
+#   - an FTS5 index over title + ingredient names backs /api/recipe/search
+#   - per-user collections are a (user_id, recipe_id) table
+#   - find() lets generate_recipe reuse a stored recipe instead of the LLM;
+#     cached generations are only reused for the same dish + preference set
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from dietary_rules import RULES, compile_rules, normalize_preference, tokenize
+from quantity import scale_qty
+
+DB_PATH = os.getenv(
+    "RECIPE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recipes.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id TEXT PRIMARY KEY,
+    title_key TEXT NOT NULL,
+    servings INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recipes_title ON recipes (title_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5 (id UNINDEXED, title, ingredients);
+CREATE TABLE IF NOT EXISTS collections (
+    user_id TEXT NOT NULL,
+    recipe_id TEXT NOT NULL REFERENCES recipes (id),
+    saved REAL NOT NULL,
+    PRIMARY KEY (user_id, recipe_id)
+);
+CREATE TABLE IF NOT EXISTS generations (
+    title_key TEXT NOT NULL,
+    prefs_key TEXT NOT NULL,
+    recipe_id TEXT NOT NULL REFERENCES recipes (id),
+    created REAL NOT NULL,
+    PRIMARY KEY (title_key, prefs_key, recipe_id)
+);
+"""
+
+
+def title_key(title: str) -> str:
+    """Normalized dish name used for exact reuse lookups ("Paneer Tikkas" -> "paneer tikka")."""
+    return " ".join(tokenize(title))
+
+
+def prefs_key(preferences: Optional[List[str]]) -> str:
+    """Order- and case-insensitive key for a preference list, including ones no rule knows."""
+    return "|".join(sorted({normalize_preference(p) for p in preferences or [] if p.strip()}))
+
+
+def recipe_id(recipe: Dict) -> str:
+    """Content hash over what makes two recipes the same dish (not nutrition)."""
+    content = {
+        "title": title_key(recipe.get("title", "")),
+        "servings": recipe.get("servings"),
+        "ingredients": sorted(
+            (i.get("name", "").lower().strip(), i.get("qty", "").lower().strip())
+            for i in recipe.get("ingredients", [])
+        ),
+        "steps": [s.strip() for s in recipe.get("steps", [])],
+    }
+    raw = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=12).hexdigest()
+
+
+def _fts_query(text: str) -> str:
+    # Quote every token so user input cannot inject FTS syntax; prefix-match the words
+    return " ".join(f'"{tok}"*' for tok in tokenize(text))
+
+
+class RecipeStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def save(self, recipe: Dict, user_id: Optional[str] = None, source: str = "user",
+             dish: Optional[str] = None, preferences: Optional[List[str]] = None) -> Dict:
+        """
+        Store a recipe (once per content hash) and add it to the user's
+        collection. `dish` is the name find() should match, when it differs
+        from the title (e.g. the dish a generation was requested for).
+        Generated recipes are also recorded under (dish, preferences) so
+        find() only reuses them for the same request.
+        """
+        rid = recipe_id(recipe)
+        now = time.time()
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO recipes (id, title_key, servings, data, source, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (rid, title_key(dish or recipe.get("title", "")), recipe.get("servings") or 1,
+                 json.dumps(recipe, ensure_ascii=False), source, now),
+            )
+            created = cur.rowcount == 1
+            if created:
+                self._db.execute(
+                    "INSERT INTO recipes_fts (id, title, ingredients) VALUES (?, ?, ?)",
+                    (rid, recipe.get("title", ""), " ".join(i.get("name", "") for i in recipe.get("ingredients", []))),
+                )
+            if source == "generated":
+                self._db.execute(
+                    "INSERT OR IGNORE INTO generations (title_key, prefs_key, recipe_id, created) "
+                    "VALUES (?, ?, ?, ?)",
+                    (title_key(dish or recipe.get("title", "")), prefs_key(preferences), rid, now),
+                )
+            if user_id:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO collections (user_id, recipe_id, saved) VALUES (?, ?, ?)",
+                    (user_id, rid, now),
+                )
+        return {"id": rid, "duplicate": not created}
+
+    def get(self, rid: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT id, data FROM recipes WHERE id = ?", (rid,)).fetchone()
+        return self._row(row) if row else None
+
+    def search(self, text: str, user_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Full-text search over titles and ingredient names, best match first."""
+        query = _fts_query(text)
+        if not query:
+            return []
+
+        sql = (
+            "SELECT r.id, r.data FROM recipes_fts f JOIN recipes r ON r.id = f.id "
+            "WHERE recipes_fts MATCH ?"
+        )
+        args = [query]
+        if user_id:
+            sql += " AND r.id IN (SELECT recipe_id FROM collections WHERE user_id = ?)"
+            args.append(user_id)
+        sql += " ORDER BY bm25(recipes_fts) LIMIT ?"
+        args.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [self._row(r) for r in rows]
+
+    def collection(self, user_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT r.id, r.data FROM collections c JOIN recipes r ON r.id = c.recipe_id "
+                "WHERE c.user_id = ? ORDER BY c.saved DESC",
+                (user_id,),
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def remove(self, user_id: str, rid: str) -> bool:
+        """Drop a recipe from a collection (the shared recipe row stays)."""
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "DELETE FROM collections WHERE user_id = ? AND recipe_id = ?", (user_id, rid)
+            )
+        return cur.rowcount > 0
+
+    def find(self, dish: str, servings: int, preferences: List[str]) -> Optional[Dict]:
+        """
+        Stored recipe for `dish` rescaled to `servings`: a user-saved recipe
+        that breaks none of the dietary rules for `preferences` (only when
+        every preference is one the rules know), else a recipe generated
+        earlier for the same dish and preference set.
+        """
+        key = title_key(dish)
+        checkable = all(normalize_preference(p) in RULES["rules"] for p in preferences or [])
+        with self._lock:
+            rows = []
+            if checkable:
+                rows = self._db.execute(
+                    "SELECT id, data, source FROM recipes WHERE title_key = ? AND source = 'user' "
+                    "ORDER BY created DESC LIMIT 20",
+                    (key,),
+                ).fetchall()
+            rows += self._db.execute(
+                "SELECT r.id, r.data, r.source FROM generations g JOIN recipes r ON r.id = g.recipe_id "
+                "WHERE g.title_key = ? AND g.prefs_key = ? ORDER BY g.created DESC LIMIT 1",
+                (key, prefs_key(preferences)),
+            ).fetchall()
+
+        matcher = compile_rules(preferences)
+        for row in rows:
+            recipe = self._row(row)
+            if row["source"] == "user" and any(
+                matcher.violation(i.get("name", "")) for i in recipe.get("ingredients", [])
+            ):
+                continue
+
+            old = recipe.get("servings") or 0
+            if servings and old and servings != old:
+                for ing in recipe["ingredients"]:
+                    ing["qty"] = scale_qty(ing.get("qty", ""), servings / old)
+                recipe["servings"] = servings
+            return recipe
+        return None
+
+    @staticmethod
+    def _row(row) -> Dict:
+        recipe = json.loads(row["data"])
+        recipe["id"] = row["id"]
+        return recipe
+
+
+recipe_store = RecipeStore()
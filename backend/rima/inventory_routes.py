@@ -1,4 +1,4 @@
-# models/rima/inventory_routes.py
+# rima/inventory_routes.py
 
 import io
 import time
@@ -7,23 +7,27 @@ from typing import List
 
 import numpy as np
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from PIL import Image
 
-# Relative imports inside the `models` package
-from ..laraib.multi_model_detection import detect_best_conf
+from multi_model_detection import detect_best_conf
+from telemetry import span
 from .ocr_mistral import ocr_bill_mistral
+from .shelf_life import lookup as shelf_life_lookup
+from serialization import trusted
 
 router = APIRouter()
 
 class InventoryItem(BaseModel):
     id: int
     name: str
-    category: str
-    quantity: int
-    expiryDate: str
-    status: str
-    daysLeft: int
+    category: str = "Unknown"
+    quantity: int = 1
+    expiryDate: str = ""     # filled from the shelf-life table when empty
+    status: str = ""
+    daysLeft: int = 0
+    storage: str = ""        # fridge | pantry | freezer
 
 
 # In-memory inventory (resets when server restarts)
@@ -38,6 +42,40 @@ def compute_status(days_left: int) -> str:
     return "fresh"
 
 
+def make_item(name: str, storage: str = "", quantity: int = 1, item_id: int = 0) -> InventoryItem:
+    """Build an inventory item with expiry taken from the shelf-life table."""
+    with span("shelf_life"):
+        shelf = shelf_life_lookup(name, storage or None)
+    days = shelf["days"]
+    # every field is computed here, so skip Pydantic validation
+    return trusted(
+        InventoryItem,
+        id=item_id or int(time.time() * 1000),
+        name=name,
+        category=shelf["category"],
+        quantity=quantity,
+        expiryDate=(datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
+        status=compute_status(days),
+        daysLeft=days,
+        storage=shelf["storage"],
+    )
+
+
+def _make_items(names: List[str]) -> List[InventoryItem]:
+    """Shelf-life lookups for a bill; unknown items may need an LLM call each."""
+    new_items: List[InventoryItem] = []
+
+    for name in names:
+        item = make_item(name.capitalize())
+        inventory.append(item)
+        new_items.append(item)
+
+        # tiny sleep to avoid duplicate IDs on fast loops
+        time.sleep(0.001)
+
+    return new_items
+
+
 @router.get("/inventory")
 def get_inventory():
     """Return inventory with updated daysLeft + status."""
@@ -52,6 +90,11 @@ def get_inventory():
 @router.post("/inventory")
 def add_item(item: InventoryItem):
     """Add an item manually (used if you post from frontend)."""
+    if not item.expiryDate:
+        shelf_item = make_item(item.name, item.storage, item.quantity, item.id)
+        if item.category != "Unknown":
+            shelf_item.category = item.category
+        item = shelf_item
     inventory.append(item)
     return {"message": "Item added", "item": item}
 
@@ -68,26 +111,19 @@ async def scan_item(file: UploadFile = File(...)):
     """
     Scan a single ingredient photo with YOLO and add it to inventory.
     """
-    img = Image.open(io.BytesIO(await file.read()))
-    arr = np.array(img)
+    with span("upload_read"):
+        data = await file.read()
+    with span("decode"):
+        arr = np.array(Image.open(io.BytesIO(data)))
 
-    labels, _, _ = detect_best_conf(arr, "auto")
+    with span("detect"):
+        labels, _, _ = detect_best_conf(arr, "auto")
 
     if not labels:
         raise HTTPException(status_code=400, detail="No ingredient detected")
 
-    name = labels[0].title()
-    days = 5  # default shelf-life guess
-
-    item = InventoryItem(
-        id=int(time.time() * 1000),
-        name=name,
-        category="Unknown",
-        quantity=1,
-        expiryDate=(datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
-        status=compute_status(days),
-        daysLeft=days,
-    )
+    # a table miss asks the LLM, so keep the lookup off the event loop
+    item = await run_in_threadpool(make_item, labels[0].title())
 
     inventory.append(item)
     return item
@@ -98,31 +134,15 @@ async def scan_bill(file: UploadFile = File(...)):
     """
     Scan a grocery bill using Mistral OCR and add detected items to inventory.
     """
-    img = Image.open(io.BytesIO(await file.read()))
-    names = ocr_bill_mistral(img)
+    with span("upload_read"):
+        data = await file.read()
+    with span("ocr"):
+        names = ocr_bill_mistral(Image.open(io.BytesIO(data)))
 
     if not names:
         raise HTTPException(status_code=400, detail="No grocery items found")
 
-    new_items: List[InventoryItem] = []
-
-    for name in names:
-        days = 7  # default for packaged groceries
-        item = InventoryItem(
-            id=int(time.time() * 1000),
-            name=name.capitalize(),
-            category="Unknown",
-            quantity=1,
-            expiryDate=(datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
-            status=compute_status(days),
-            daysLeft=days,
-        )
-        inventory.append(item)
-        new_items.append(item)
-
-        # tiny sleep to avoid duplicate IDs on fast loops
-        time.sleep(0.001)
-
+    new_items = await run_in_threadpool(_make_items, names)
     return {"added": new_items}
 
 
@@ -1,16 +1,39 @@
 # models/rima/ocr_mistral.py
 
 import io
+import os
 import base64
-from typing import List
+from typing import List, Tuple
 
-from PIL import Image
+import numpy as np
+from PIL import Image, ImageOps
 from mistralai import Client
 
 from config import MISTRAL_API_KEY
+from telemetry import span
+from admission import LIMITERS
 
 client = Client(api_key=MISTRAL_API_KEY)
 
+# Upload encoding for the OCR call. The model reads text fine well below
+# camera resolution, so we send a small grayscale JPEG instead of a full PNG.
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))
+OCR_FORMAT = os.getenv("OCR_FORMAT", "JPEG").strip().upper()   # JPEG | WEBP | PNG
+OCR_FORMAT = {"JPG": "JPEG"}.get(OCR_FORMAT, OCR_FORMAT)
+OCR_QUALITY = int(os.getenv("OCR_QUALITY", "70"))
+
+_MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+if OCR_FORMAT not in _MIME:
+    raise ValueError(f"OCR_FORMAT must be one of {sorted(_MIME)}, got {OCR_FORMAT!r}")
+
+OCR_MODEL = "pixtral-12b-ocr-latest"
+OCR_PROMPT = (
+    "You are reading a grocery store bill image. "
+    "Extract only the food item names as plain text. "
+    "Ignore prices, quantities, codes, discounts and totals. "
+    "Return a clean comma-separated list of item names."
+)
+
 # Simple vocabulary of grocery items we care about
 KNOWN_INGREDIENTS = [
     "milk", "egg", "eggs", "apple", "banana", "spinach", "chicken",
@@ -28,40 +51,105 @@ def extract_items_from_text(text: str) -> List[str]:
     return list(set(found))  # unique
 
 
+# =========================
+# UPLOAD PREPROCESSING
+# =========================
+
+def _receipt_bbox(gray: Image.Image) -> Tuple[int, int, int, int]:
+    """
+    Find the bright paper region on a small thumbnail and map it back to
+    full-resolution coordinates. Falls back to the whole image.
+    """
+    w, h = gray.size
+    thumb = gray.copy()
+    thumb.thumbnail((256, 256))
+    arr = np.asarray(thumb, dtype=np.float32)
+
+    bright = arr > max(arr.mean(), 128)
+    rows = np.where(bright.mean(axis=1) > 0.3)[0]
+    cols = np.where(bright.mean(axis=0) > 0.3)[0]
+    if len(rows) == 0 or len(cols) == 0:
+        return 0, 0, w, h
+
+    sy, sx = h / arr.shape[0], w / arr.shape[1]
+    top, bottom = rows[0] * sy, (rows[-1] + 1) * sy
+    left, right = cols[0] * sx, (cols[-1] + 1) * sx
+
+    # Too small to be the receipt (glare, a label) -> keep everything
+    if (bottom - top) * (right - left) < 0.2 * w * h:
+        return 0, 0, w, h
+
+    pad_x, pad_y = 0.02 * w, 0.02 * h
+    return (
+        int(max(0, left - pad_x)),
+        int(max(0, top - pad_y)),
+        int(min(w, right + pad_x)),
+        int(min(h, bottom + pad_y)),
+    )
+
+
+def preprocess_for_ocr(image: Image.Image, max_side: int = OCR_MAX_SIDE) -> Image.Image:
+    """
+    Crop to the receipt, convert to grayscale and downsample so the long
+    side is at most `max_side` pixels.
+    """
+    # JPEG uploads can be decoded directly at a reduced scale
+    if image.format == "JPEG":
+        image.draft("L", (max_side, max_side))
+
+    image = ImageOps.exif_transpose(image)
+    gray = image.convert("L")
+
+    gray = gray.crop(_receipt_bbox(gray))
+
+    if max(gray.size) > max_side:
+        gray.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    return gray
+
+
+def encode_for_ocr(image: Image.Image, fmt: str = OCR_FORMAT, quality: int = OCR_QUALITY) -> Tuple[str, str]:
+    """Returns (mime_type, base64 payload) for the preprocessed image."""
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG")
+    else:
+        image.save(buffer, format=fmt, quality=quality)
+    return _MIME[fmt], base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
 def ocr_bill_mistral(image: Image.Image) -> List[str]:
     """
     Use Mistral multimodal OCR to extract items from a bill image.
     Returns a list of matched grocery item names.
     """
-    buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    img_bytes = buffer.getvalue()
-    img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-
-    prompt = (
-        "You are reading a grocery store bill image. "
-        "Extract only the food item names as plain text. "
-        "Ignore prices, quantities, codes, discounts and totals. "
-        "Return a clean comma-separated list of item names."
-    )
+    with span("ocr_preprocess"):
+        image = preprocess_for_ocr(image)
+    with span("ocr_encode"):
+        mime, img_b64 = encode_for_ocr(image)
+    return ocr_items(mime, img_b64)
+
 
-    resp = client.chat.complete(
-        model="pixtral-12b-ocr-latest",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{img_b64}"
+def ocr_items(mime: str, img_b64: str) -> List[str]:
+    """The OCR call + item matching for an already encoded image."""
+    with LIMITERS["ocr"].slot(), span("ocr_call"):
+        resp = client.chat.complete(
+            model=OCR_MODEL,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": OCR_PROMPT},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime};base64,{img_b64}"
+                            },
                         },
-                    },
-                ],
-            }
-        ],
-    )
+                    ],
+                }
+            ],
+        )
 
     raw = resp.choices[0].message.content.strip()
     return extract_items_from_text(raw)
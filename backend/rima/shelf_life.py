@@ -0,0 +1,145 @@
+# rima/shelf_life.py
+
+import os
+import json
+import difflib
+import threading
+from typing import Dict, Optional
+
+from prompt_budget import OUTPUT_TOKENS
+from admission import Overloaded
+from dietary_rules import tokenize
+from substitutions import DESCRIPTORS
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TABLE_PATH = os.path.join(DATA_DIR, "shelf_life.json")
+LEARNED_PATH = os.path.join(DATA_DIR, "shelf_life_learned.json")
+
+STORAGES = ("fridge", "pantry", "freezer")
+UNKNOWN_DAYS = 5  # last resort when neither the table nor the LLM knows
+
+_lock = threading.Lock()
+_unresolved = set()  # names the LLM could not answer; not retried until restart
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().replace("_", " ").replace("-", " ").split())
+
+
+def _load(path: str) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Loaded once at import: canonical name -> entry, and alias -> canonical name
+TABLE: Dict[str, Dict] = _load(TABLE_PATH)
+LEARNED: Dict[str, Dict] = _load(LEARNED_PATH)
+
+ALIASES: Dict[str, str] = {}
+for _name, _entry in TABLE.items():
+    ALIASES[_name] = _name
+    for _alias in _entry.get("aliases", []):
+        ALIASES[normalize_name(_alias)] = _name
+
+
+def _match_local(name: str) -> Optional[str]:
+    """
+    Resolve a raw item name to a canonical table key:
+    exact/alias -> singular -> known phrase at the end of the name when every
+    word before it is a descriptor -> fuzzy.
+    """
+    if name in ALIASES:
+        return ALIASES[name]
+    if name.endswith("s") and name[:-1] in ALIASES:
+        return ALIASES[name[:-1]]
+
+    # "fresh spinach" -> "spinach", but "coconut milk", "chicken stock" and
+    # "canned tomatoes" are other products: left to the LLM
+    tokens = name.split()
+    for size in range(min(3, len(tokens) - 1), 0, -1):
+        if not set(tokenize(" ".join(tokens[:-size]))) <= DESCRIPTORS:
+            continue
+        phrase = " ".join(tokens[-size:])
+        if phrase in ALIASES:
+            return ALIASES[phrase]
+        if phrase.endswith("s") and phrase[:-1] in ALIASES:
+            return ALIASES[phrase[:-1]]
+
+    close = difflib.get_close_matches(name, ALIASES.keys(), n=1, cutoff=0.85)
+    return ALIASES[close[0]] if close else None
+
+
+def _ask_llm(name: str) -> Optional[Dict]:
+    # imported here: llm_client needs the API config, table lookups do not
+    from llm_client import call_llm
+
+    prompt = f"""
+Only JSON. Typical home shelf life of the grocery item "{name}" after purchase.
+
+Schema:
+{{"category": "string", "storage": "fridge"|"pantry"|"freezer", "days": {{"fridge": int, "pantry": int, "freezer": int}}}}
+"""
+    data = call_llm(prompt, OUTPUT_TOKENS["shelf_life"], prompt_type="shelf_life")
+    if not isinstance(data, dict) or data.get("storage") not in STORAGES:
+        return None
+
+    days = {
+        k: int(v) for k, v in (data.get("days") or {}).items()
+        if k in STORAGES and isinstance(v, (int, float)) and v > 0
+    }
+    if data["storage"] not in days:
+        return None
+    return {"category": str(data.get("category") or "Unknown"), "storage": data["storage"], "days": days}
+
+
+def _learn(name: str) -> Optional[Dict]:
+    if name in _unresolved:
+        return None
+    try:
+        entry = _ask_llm(name)
+    except Overloaded:
+        return None   # LLM shed this call; not remembered as unresolved, so retried later
+    if entry is None:
+        _unresolved.add(name)
+        return None
+    with _lock:
+        LEARNED[name] = entry
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp = LEARNED_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(LEARNED, f, indent=1)
+        os.replace(tmp, LEARNED_PATH)
+    return entry
+
+
+def lookup(name: str, storage: Optional[str] = None, use_llm: bool = True) -> Dict:
+    """
+    Shelf life for an item name.
+    Returns {"name", "category", "storage", "days", "source"} where source is
+    "table", "learned", "llm" or "default".
+    """
+    key = normalize_name(name)
+
+    canonical = _match_local(key)
+    if canonical:
+        entry, source = TABLE[canonical], "table"
+    elif key in LEARNED:
+        canonical, entry, source = key, LEARNED[key], "learned"
+    else:
+        entry = _learn(key) if use_llm else None
+        canonical, source = key, "llm"
+        if entry is None:
+            return {"name": key, "category": "Unknown", "storage": storage or "fridge",
+                    "days": UNKNOWN_DAYS, "source": "default"}
+
+    days_by_storage = entry["days"]
+    where = storage if storage in days_by_storage else entry["storage"]
+    return {
+        "name": canonical,
+        "category": entry["category"],
+        "storage": where,
+        "days": days_by_storage[where],
+        "source": source,
+    }
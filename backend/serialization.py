@@ -0,0 +1,139 @@
+# serialization.py
+#
+# Cheaper response path for the large JSON payloads (/analyze carries a
+# base64 image, recipe responses are deeply nested):
+#   - FastJSONResponse serializes with orjson when it is installed; routes
+#     return it directly so FastAPI skips jsonable_encoder
+#   - dump() / trusted() are the Pydantic v1/v2-neutral model_dump / model_construct
+#   - CompressionMiddleware gzip- or brotli-encodes responses above a size
+#     threshold, negotiated from Accept-Encoding (brotli is optional)
+
+import os
+import gzip
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Bodies larger than this are compressed in a worker thread, not on the event loop
+COMPRESS_OFFLOAD_BYTES = 256 * 1024
+
+# Already-compressed or streamed media types are passed through untouched
+SKIP_TYPES = ("image/", "video/", "audio/", "text/event-stream", "application/zip", "application/gzip")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (NumPy values allowed); stdlib json as fallback."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def dump(model) -> dict:
+    return model.model_dump() if hasattr(model, "model_dump") else model.dict()
+
+
+def trusted(model_cls, **fields):
+    """Build a model from data we produced ourselves, skipping validation."""
+    if hasattr(model_cls, "model_construct"):
+        return model_cls.model_construct(**fields)
+    return model_cls.construct(**fields)
+
+
+def choose_encoding(accept_encoding: str):
+    """Best supported coding from an Accept-Encoding header ("br", "gzip" or None)."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware: buffers single-message responses and compresses them
+    when they are large enough. Streaming responses (SSE, more_body=True) pass
+    through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        coding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                media = headers.get("content-type", "")
+                if "content-encoding" in headers or media.startswith(SKIP_TYPES):
+                    passthrough = True
+                    await send(start)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            if len(body) > COMPRESS_OFFLOAD_BYTES:
+                body = await run_in_threadpool(compress, body, coding)
+            else:
+                body = compress(body, coding)
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
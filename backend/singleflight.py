@@ -0,0 +1,65 @@
+# singleflight.py
+#
+# Coalesce identical in-flight calls: the first caller for a key does the work,
+# concurrent callers with the same key wait for it and get a copy of its result.
+
+import copy
+import hashlib
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, copy_result: bool = True):
+        # Followers get a deep copy so callers can mutate their result freely
+        self.copy_result = copy_result
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.shared = 0   # calls answered by someone else's request
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result) if self.copy_result else call.result
+
+        try:
+            result = fn()
+            # keep a private copy: the leader may start mutating its result right away
+            call.result = copy.deepcopy(result) if self.copy_result else result
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def make_key(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
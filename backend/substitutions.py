@@ -0,0 +1,150 @@
+# backend/substitutions.py
+#
+# Ingredient substitution graph (data/substitutions.json), loaded once at
+# import. Each edge ingredient -> substitute carries a weight (how close the
+# swap is) and the diets it is safe for. Replacements the LLM suggests for
+# unknown ingredients are written back to data/substitutions_learned.json and
+# served locally from then on.
+
+import os
+import json
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from dietary_rules import RULES, compile_rules, normalize_preference, tokenize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GRAPH_PATH = os.path.join(DATA_DIR, "substitutions.json")
+LEARNED_PATH = os.path.join(DATA_DIR, "substitutions_learned.json")
+
+LEARNED_WEIGHT = 0.5  # LLM suggestions rank below curated edges
+
+# Words that may precede a known ingredient without changing what it is
+# ("unsalted butter" -> butter). Anything else makes it a different thing:
+# "chicken stock", "butter chicken" are not chicken / butter.
+DESCRIPTORS = frozenset(tokenize(
+    "fresh frozen dried dry raw cooked boiled roasted chopped minced sliced diced grated "
+    "crushed ground whole boneless skinless unsalted salted plain organic homemade "
+    "low full fat free skimmed toned light extra virgin baby cherry large small medium "
+    "crunchy smooth dark red green white brown black yellow greek"
+))
+
+
+def _key(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+def _load(path: str) -> Dict[str, List[Dict]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SubstitutionGraph:
+    def __init__(self, edges: Dict[str, List[Dict]], learned: Dict[str, List[Dict]], learned_path: str):
+        self.learned = learned
+        self.learned_path = learned_path
+        self._lock = threading.Lock()
+
+        # normalized ingredient -> edges sorted by weight (best first)
+        self.adj: Dict[str, List[Dict]] = {}
+        for name, subs in edges.items():
+            self._add(name, subs)
+        for name, subs in learned.items():
+            self._add(name, subs)
+
+        self.max_len = max((len(k.split()) for k in self.adj), default=1)
+
+    def _add(self, name: str, subs: List[Dict]):
+        key = _key(name)
+        edges = self.adj.setdefault(key, [])
+        known = {_key(e["name"]) for e in edges}
+        for sub in subs:
+            if _key(sub["name"]) in known:
+                continue
+            known.add(_key(sub["name"]))
+            edges.append({
+                "name": sub["name"],
+                "weight": float(sub.get("weight", LEARNED_WEIGHT)),
+                "tags": frozenset(sub["tags"]) if "tags" in sub else None,
+                "reason": sub.get("reason", ""),
+                "key": _key(sub["name"]),
+            })
+        edges.sort(key=lambda e: -e["weight"])
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Graph node for `name`: exact (plurals included), else the longest known
+        phrase at the end of the name when every word before it is a
+        DESCRIPTOR ("boneless chicken" -> chicken, "chicken stock" -> None).
+        """
+        key = _key(name)
+        if key in self.adj:
+            return key
+        toks = key.split()
+        for size in range(min(self.max_len, len(toks) - 1), 0, -1):
+            phrase = " ".join(toks[-size:])
+            if phrase in self.adj and all(t in DESCRIPTORS for t in toks[:-size]):
+                return phrase
+        return None
+
+    def query(self, name: str, preferences: Optional[List[str]] = None,
+              exclude: Iterable[str] = (), limit: int = 3) -> List[Dict]:
+        """
+        Best substitutes for `name` that satisfy `preferences`. Curated edges
+        must carry every requested diet tag; all edges (learned ones included)
+        must also pass the dietary rule matcher. Names in `exclude` are skipped.
+        """
+        node = self.resolve(name)
+        if node is None:
+            return []
+
+        diets = {p for p in map(normalize_preference, preferences or []) if p in RULES["rules"]}
+        matcher = compile_rules(preferences)
+        skip = {_key(x) for x in exclude} | {node}
+
+        out = []
+        for edge in self.adj[node]:
+            if edge["key"] in skip:
+                continue
+            if edge["tags"] is not None and not diets <= edge["tags"]:
+                continue
+            if matcher.violation(edge["name"]):
+                continue
+            out.append({"name": edge["name"], "reason": edge["reason"]})
+            if len(out) >= limit:
+                break
+        return out
+
+    def learn(self, name: str, replacements: List[Dict]):
+        """Write LLM replacements back into the graph and the learned file."""
+        subs = [
+            {"name": r["name"], "weight": LEARNED_WEIGHT, "reason": r.get("reason", "")}
+            for r in replacements
+            if isinstance(r, dict) and r.get("name") and r["name"] != "None"
+        ]
+        if not subs:
+            return
+
+        key = _key(name)
+        with self._lock:
+            self._add(key, subs)
+            self.max_len = max(self.max_len, len(key.split()))
+            saved = self.learned.setdefault(key, [])
+            seen = {_key(s["name"]) for s in saved}
+            saved.extend(s for s in subs if _key(s["name"]) not in seen)
+            try:
+                tmp = self.learned_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.learned, f, indent=1)
+                os.replace(tmp, self.learned_path)
+            except Exception as e:
+                print("SUBSTITUTIONS SAVE ERROR:", e)
+
+
+def load_graph(path: str = GRAPH_PATH, learned_path: str = LEARNED_PATH) -> SubstitutionGraph:
+    return SubstitutionGraph(_load(path), _load(learned_path), learned_path)
+
+
+substitution_graph = load_graph()
@@ -0,0 +1,192 @@
+# telemetry.py
+#
+# Per-stage timing spans for the API routes.
+#   - span("decode") around any stage records its duration for the current request
+#   - TimingMiddleware turns the spans into a Server-Timing response header
+#   - every span and request also feeds a Prometheus histogram, served at /metrics
+#   - PROFILE_SAMPLE_RATE > 0 runs a stack-sampling profiler on that share of requests
+
+import os
+import sys
+import time
+import random
+import threading
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+
+# Spans of the request being handled: list of (stage, seconds)
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("spans", default=None)
+
+
+# =========================
+# HISTOGRAMS
+# =========================
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], List] = {}   # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for labels, (counts, total, count) in items:
+                base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+                sep = "," if base else ""
+                for bound, c in zip(BUCKETS, counts):
+                    lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {c}')
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+                lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Duration of a request stage.", ("stage",))
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Duration of HTTP requests.", ("method", "route", "status")
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(STAGE_SECONDS.render() + REQUEST_SECONDS.render()) + "\n"
+
+
+# =========================
+# SPANS
+# =========================
+
+@contextmanager
+def span(stage: str):
+    """Time a block; recorded on the current request (if any) and in /metrics."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+        STAGE_SECONDS.observe(elapsed, stage)
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in spans]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# =========================
+# SAMPLING PROFILER
+# =========================
+
+class StackSampler:
+    """
+    Samples the Python stacks of all threads every `interval` seconds and writes
+    them in folded format (one "frame;frame;frame count" per line) for flame graphs.
+    Threadpool workers are included, so sync endpoints show up too.
+    """
+
+    def __init__(self, name: str, interval: float = PROFILE_INTERVAL_S):
+        self.name = name
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = ";".join(
+                    f"{os.path.basename(f.filename)}:{f.name}"
+                    for f in traceback.extract_stack(frame)
+                )
+                self.stacks[stack] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = self.name.strip("/").replace("/", "_") or "root"
+        path = os.path.join(PROFILE_DIR, f"{safe}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _default_profiler(path: str):
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return StackSampler(path)
+    return None
+
+
+# hook(path) -> context manager or None; replace with set_profiler_hook()
+_profiler_hook = _default_profiler
+
+
+def set_profiler_hook(hook):
+    global _profiler_hook
+    _profiler_hook = hook or _default_profiler
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        spans: List[Tuple[str, float]] = []
+        token = _spans.set(spans)
+        profiler = _profiler_hook(request.url.path)
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            if profiler is not None:
+                with profiler:
+                    response = await call_next(request)
+            else:
+                response = await call_next(request)
+            status = response.status_code
+        finally:
+            total = time.perf_counter() - t0
+            _spans.reset(token)
+            route = request.scope.get("route")
+            REQUEST_SECONDS.observe(
+                total, request.method, getattr(route, "path", "unmatched"), str(status)
+            )
+
+        response.headers["Server-Timing"] = server_timing(spans, total)
+        return response
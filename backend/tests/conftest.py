@@ -0,0 +1,8 @@
+# tests/conftest.py
+#
+# Backend modules import each other as top-level modules (run from backend/)
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
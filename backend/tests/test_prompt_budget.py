@@ -0,0 +1,43 @@
+# tests/test_prompt_budget.py
+#
+# Prompt size regression tests: every prompt built from the representative
+# inputs in benchmarks/prompt_sizes.py must stay within its input budget.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from prompt_budget import estimate_tokens, compact_json, PROMPT_TOKEN_BUDGET, OUTPUT_TOKENS  # noqa: E402
+from prompt_sizes import prompts, RECIPE  # noqa: E402
+from recipe_prompt import build_recipe_prompt, build_adjust_recipe_prompt  # noqa: E402
+
+PROMPTS = prompts()
+
+
+@pytest.mark.parametrize("name", sorted(PROMPT_TOKEN_BUDGET))
+def test_prompt_within_budget(name):
+    tokens = estimate_tokens(PROMPTS[name])
+    assert tokens <= PROMPT_TOKEN_BUDGET[name], f"{name} prompt is {tokens} tokens"
+
+
+def test_every_budgeted_prompt_has_an_output_cap():
+    assert set(PROMPT_TOKEN_BUDGET) <= set(OUTPUT_TOKENS)
+
+
+def test_recipe_prompt_without_preferences_within_budget():
+    assert estimate_tokens(build_recipe_prompt("dal", 2, [])) <= PROMPT_TOKEN_BUDGET["recipe"]
+
+
+def test_adjust_prompt_drops_ingredient_calories():
+    prompt = build_adjust_recipe_prompt(RECIPE, [], [], [])
+    assert '"calories"' not in prompt
+    assert estimate_tokens(prompt) <= PROMPT_TOKEN_BUDGET["adjust"]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("rice") == 1
+    assert estimate_tokens(compact_json({"kcal": 1200})) == 8   # { " kcal " : 120 0 }
@@ -0,0 +1,28 @@
+# tests/test_quantity.py
+
+import pytest
+
+from quantity import parse_qty, scale_qty, add_qty
+
+
+@pytest.mark.parametrize("text, scaled", [
+    ("200 g", "400 g"),
+    ("1 1/2 cups", "3 cups"),
+    ("½ tsp", "1 tsp"),
+    ("1-2 cloves", "2-4 cloves"),
+    ("3 tsp", "2 tbsp"),
+])
+def test_scale_qty(text, scaled):
+    assert scale_qty(text, 2) == scaled
+
+
+@pytest.mark.parametrize("text", ["to taste", "a pinch", "2 to taste", "1 as needed", "1/0 cup", ""])
+def test_unscalable_quantities_are_left_alone(text):
+    assert parse_qty(text) is None
+    assert scale_qty(text, 2) == text
+
+
+def test_add_qty():
+    assert add_qty("200 g", "0.5 kg") == "700 g"
+    assert add_qty("1 tsp", "a pinch") is None
+    assert add_qty("1 cup", "100 g") is None
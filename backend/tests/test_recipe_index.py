@@ -0,0 +1,25 @@
+# tests/test_recipe_index.py
+
+from recipe_index import RecipeIndex
+
+
+def test_rank_with_staples_only_recipe_last():
+    index = RecipeIndex([
+        {"title": "Chicken curry", "ingredients": ["chicken", "onion"]},
+        {"title": "Salted water", "ingredients": ["salt", "water"]},
+    ])
+    results = index.rank([{"name": "chicken"}])
+    assert [r["title"] for r in results] == ["Chicken curry"]
+    assert results[0]["coverage"] == 0.5
+
+
+def test_rank_with_empty_rows_in_the_middle():
+    index = RecipeIndex([
+        {"title": "Salted water", "ingredients": ["salt"]},
+        {"title": "Omelette", "ingredients": ["egg", "onion"]},
+        {"title": "Plain oil", "ingredients": ["oil"]},
+        {"title": "Egg bhurji", "ingredients": ["egg", "tomato", "onion"]},
+    ])
+    results = index.rank([{"name": "eggs", "daysLeft": 1}, {"name": "onion"}])
+    assert [r["title"] for r in results] == ["Omelette", "Egg bhurji"]
+    assert results[1]["missing"] == ["tomato"]
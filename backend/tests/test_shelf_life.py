@@ -0,0 +1,37 @@
+# tests/test_shelf_life.py
+
+import pytest
+
+from rima.shelf_life import lookup, UNKNOWN_DAYS
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("Milk", "milk"),
+    ("toned milk", "milk"),
+    ("Eggs", "egg"),
+    ("Tomatoes", "tomato"),
+    ("fresh spinach", "spinach"),
+    ("boneless chicken", "chicken"),
+])
+def test_lookup_from_table(name, canonical):
+    shelf = lookup(name, use_llm=False)
+    assert shelf["name"] == canonical
+    assert shelf["source"] == "table"
+    assert shelf["days"] > 0
+
+
+@pytest.mark.parametrize("name", [
+    "milk powder", "coconut milk", "almond milk", "chicken stock",
+    "peanut butter", "chilli sauce", "canned tomatoes",
+])
+def test_other_products_are_not_matched_to_a_base_ingredient(name):
+    shelf = lookup(name, use_llm=False)
+    assert shelf["source"] == "default"
+    assert shelf["days"] == UNKNOWN_DAYS
+
+
+def test_lookup_uses_requested_storage():
+    fridge = lookup("milk", use_llm=False)
+    frozen = lookup("milk", "freezer", use_llm=False)
+    assert (fridge["storage"], frozen["storage"]) == ("fridge", "freezer")
+    assert frozen["days"] > fridge["days"]
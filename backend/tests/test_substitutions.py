@@ -0,0 +1,23 @@
+# tests/test_substitutions.py
+
+import pytest
+
+from substitutions import substitution_graph
+
+
+@pytest.mark.parametrize("name, node", [
+    ("Butter", "butter"),
+    ("Tomatoes", "tomato"),
+    ("unsalted butter", "butter"),
+    ("crunchy peanut butter", "peanut butter"),
+    ("dark soy sauce", "soy sauce"),
+    ("chicken stock", None),
+    ("butter chicken", None),
+    ("garlic powder", None),
+])
+def test_resolve(name, node):
+    assert substitution_graph.resolve(name) == node
+
+
+def test_query_for_a_stock_offers_no_protein_swaps():
+    assert substitution_graph.query("chicken stock") == []
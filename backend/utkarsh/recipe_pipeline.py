@@ -4,7 +4,8 @@ import json
 from typing import List, Dict
 
 from llm_client import call_llm
-from analysis_pipeline import analyze_nutrition
+from recipe_nutrition import enqueue_nutrition
+from prompt_budget import OUTPUT_TOKENS
 from recipe_prompt import (
     build_recipe_prompt,
     build_adjust_recipe_prompt,
@@ -17,6 +18,8 @@ def _extract_json(text: str) -> Dict:
     Try to robustly parse JSON from LLM output.
     Assumes the first '{' to last '}' is the JSON object.
     """
+    if isinstance(text, dict):  # call_llm already parsed it
+        return text
     try:
         return json.loads(text)
     except json.JSONDecodeError:
@@ -28,37 +31,16 @@ def _extract_json(text: str) -> Dict:
         raise
 
 
-def _compute_nutrition_for_recipe(recipe: Dict, conditions: List[str]) -> Dict:
-    """
-    recipe["ingredients"] is a list of { name, qty }.
-    We call your existing analyze_nutrition(labels, portion, conditions).
-    """
-    ingredients = recipe.get("ingredients", [])
-    labels = [i["name"] for i in ingredients]
-    portions = [i.get("qty", "") for i in ingredients]
-
-    if not labels:
-        return {}
-
-    # Your existing diet/nutrition LLM pipeline.
-    nutrition_data = analyze_nutrition(labels, portions, conditions) or {}
-    # nutrition_data structure depends on your implementation.
-    return nutrition_data
-
-
 def generate_recipe(dish: str, servings: int, preferences: List[str]) -> Dict:
     prompt = build_recipe_prompt(dish, servings, preferences)
-    raw = call_llm(prompt)
+    raw = call_llm(prompt, OUTPUT_TOKENS["recipe"], prompt_type="recipe")
     if not raw:
         raise RuntimeError("LLM returned empty response for recipe generation.")
 
     recipe = _extract_json(raw)
 
-    # attach nutrition
-    nutrition = _compute_nutrition_for_recipe(recipe, preferences)
-    recipe["nutrition"] = nutrition
-
-    return recipe
+    # nutrition is computed in the background
+    return enqueue_nutrition(recipe, preferences)
 
 
 def adjust_recipe(
@@ -69,7 +51,7 @@ def adjust_recipe(
 ) -> Dict:
     """
     Pushes the recipe + change instructions to the LLM to get a clean adjusted recipe,
-    then recomputes nutrition.
+    then queues a nutrition recompute.
     """
     prompt = build_adjust_recipe_prompt(
         original_recipe=recipe,
@@ -78,16 +60,13 @@ def adjust_recipe(
         preferences=preferences,
     )
 
-    raw = call_llm(prompt)
+    raw = call_llm(prompt, OUTPUT_TOKENS["adjust"], prompt_type="adjust")
     if not raw:
         raise RuntimeError("LLM returned empty response for recipe adjustment.")
 
     updated_recipe = _extract_json(raw)
 
-    nutrition = _compute_nutrition_for_recipe(updated_recipe, preferences)
-    updated_recipe["nutrition"] = nutrition
-
-    return updated_recipe
+    return enqueue_nutrition(updated_recipe, preferences)
 
 
 def suggest_replacement(
@@ -101,7 +80,7 @@ def suggest_replacement(
         preferences=preferences,
     )
 
-    raw = call_llm(prompt)
+    raw = call_llm(prompt, OUTPUT_TOKENS["replacement"], prompt_type="replacement")
     if not raw:
         raise RuntimeError("LLM returned empty response for replacement suggestion.")
 